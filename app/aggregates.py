@@ -0,0 +1,207 @@
+# app/aggregates.py
+"""Единый движок агрегатов по транзакциям
+
+Один векторизованный groupby считает суммы и количества в разрезе
+type × category × month × weekday. Все страницы читают срезы этого
+«куба» вместо собственных масок и groupby по полному DataFrame.
+"""
+import calendar
+
+import numpy as np
+import pandas as pd
+
+CUBE_LEVELS = ['type', 'category', 'month', 'weekday']
+
+
+class TransactionCube:
+    """Куб агрегатов: сумма (amount) и количество (count) по уровням CUBE_LEVELS"""
+
+    def __init__(self, cube, rows):
+        self.cube = cube
+        self.rows = rows
+
+    @classmethod
+    def from_frame(cls, df):
+        """Построение куба одним проходом по DataFrame транзакций"""
+        if df.empty:
+            index = pd.MultiIndex.from_arrays([[], [], pd.PeriodIndex([], freq='M'), []], names=CUBE_LEVELS)
+            return cls(pd.DataFrame({'amount': [], 'count': []}, index=index), 0)
+
+        # Месяц и день недели — целочисленные ключи, без Python-объектов на строку
+        month = df['date'].to_numpy().astype('datetime64[M]')
+        weekday = df['date'].dt.weekday.to_numpy()
+        cube = df['amount'].groupby(
+            [df['type'], df['category'], month, weekday],
+            observed=True, sort=True
+        ).agg(['sum', 'count'])
+        return cls._from_grouped(cube, len(df))
+
+    @classmethod
+    def from_compact(cls, transactions):
+        """Куб из CompactTransactions: группировка по кодам, суммы в копейках"""
+        if transactions.empty:
+            return cls.from_frame(pd.DataFrame({'amount': [], 'category': [], 'date': pd.to_datetime([]), 'type': []}))
+
+        dates = transactions.dates()
+        month = dates.astype('datetime64[M]')
+        # 1970-01-01 — четверг
+        weekday = (transactions.day.astype('int64') + 3) % 7
+        cube = pd.Series(transactions.amount_kop).groupby(
+            [transactions.type, transactions.category, month, weekday],
+            observed=True, sort=True
+        ).agg(['sum', 'count'])
+        cube['sum'] = cube['sum'] / 100
+        return cls._from_grouped(cube, len(transactions))
+
+    @classmethod
+    def _from_grouped(cls, cube, rows):
+        """Результат groupby(...).agg(['sum', 'count']) -> куб с обычными уровнями"""
+        cube.columns = ['amount', 'count']
+        cube.index.names = CUBE_LEVELS
+        # Обычные (не категориальные) уровни, чтобы кубы разных партий складывались
+        levels = cube.index.levels
+        cube.index = cube.index.set_levels([
+            pd.Index(np.asarray(levels[0], dtype=object)),
+            pd.Index(np.asarray(levels[1], dtype=object)),
+            levels[2].to_period('M'),
+        ], level=[0, 1, 2])
+        return cls(cube, rows)
+
+    @classmethod
+    def from_daily_rollup(cls, rollup):
+        """Куб из дневной свертки SQLite (day, category, type, amount, count)
+
+        День определяет и месяц, и день недели, поэтому куб совпадает с
+        построенным по исходным транзакциям, а читается в разы меньше строк.
+        """
+        if rollup.empty:
+            return cls.from_frame(pd.DataFrame({'amount': [], 'category': [], 'date': pd.to_datetime([]), 'type': []}))
+
+        days = pd.to_datetime(rollup['day'])
+        month = days.to_numpy().astype('datetime64[M]')
+        cube = rollup[['amount', 'count']].groupby(
+            [rollup['type'].to_numpy(dtype=object), rollup['category'].to_numpy(dtype=object),
+             month, days.dt.weekday.to_numpy()],
+            sort=True
+        ).sum()
+        cube.index.names = CUBE_LEVELS
+        cube.index = cube.index.set_levels(cube.index.levels[2].to_period('M'), level=2)
+        cube['count'] = cube['count'].astype('int64')
+        return cls(cube, int(rollup['count'].sum()))
+
+    def append(self, batch):
+        """Новый куб с учётом добавленных транзакций, текущий не меняется
+
+        Считается только партия, затем её куб складывается с накопленным,
+        поэтому стоимость зависит от размера партии, а не от всей истории.
+        """
+        if batch.empty:
+            return self
+        if self.rows == 0:
+            return TransactionCube.from_frame(batch)
+
+        delta = TransactionCube.from_frame(batch)
+        cube = self.cube.add(delta.cube, fill_value=0)
+        cube['count'] = cube['count'].astype('int64')
+        return TransactionCube(cube.sort_index(), self.rows + delta.rows)
+
+    def equals(self, other, rtol=1e-9, atol=1e-6):
+        """Сравнение с другим кубом (суммы — с допуском на порядок сложения)"""
+        if self.rows != other.rows or not self.cube.index.equals(other.cube.index):
+            return False
+        return (
+            np.array_equal(self.cube['count'].to_numpy(), other.cube['count'].to_numpy())
+            and np.allclose(self.cube['amount'].to_numpy(), other.cube['amount'].to_numpy(), rtol=rtol, atol=atol)
+        )
+
+    def _for_type(self, tx_type):
+        """Строки куба для одного типа операций"""
+        return self.cube[self.cube.index.get_level_values('type') == tx_type]
+
+    def total(self, tx_type):
+        """Сумма операций одного типа"""
+        return self._for_type(tx_type)['amount'].sum()
+
+    def count(self, tx_type=None):
+        """Количество операций (всех или одного типа)"""
+        if tx_type is None:
+            return self.rows
+        return int(self._for_type(tx_type)['count'].sum())
+
+    def by_category(self, tx_type):
+        """Суммы по категориям для одного типа"""
+        part = self._for_type(tx_type)
+        return part.groupby(level='category', observed=True)['amount'].sum().rename('amount')
+
+    def category_counts(self, tx_type):
+        """Количество операций по категориям, по убыванию"""
+        part = self._for_type(tx_type)
+        counts = part.groupby(level='category', observed=True)['count'].sum()
+        return counts[counts > 0].sort_values(ascending=False).rename('count')
+
+    def monthly(self):
+        """Помесячные суммы: строки — месяцы, колонки — типы операций"""
+        monthly = self.cube.groupby(level=['month', 'type'], observed=True)['amount'].sum()
+        return monthly.unstack(fill_value=0)
+
+    def month_count(self):
+        """Количество месяцев, в которых есть операции"""
+        return self.cube.index.get_level_values('month').nunique()
+
+    def by_weekday(self, tx_type):
+        """Суммы по дням недели (названия как у dt.day_name())"""
+        part = self._for_type(tx_type)
+        by_day = part.groupby(level='weekday')['amount'].sum()
+        by_day.index = [calendar.day_name[int(day)] for day in by_day.index]
+        by_day.index.name = 'weekday'
+        return by_day.rename('amount')
+
+
+def financial_summary(cube):
+    """Финансовая сводка из куба агрегатов"""
+    if cube.rows == 0:
+        return {
+            'total_income': 0,
+            'total_expense': 0,
+            'balance': 0,
+            'transaction_count': 0,
+            'expense_by_category': pd.Series(dtype=float),
+            'income_by_category': pd.Series(dtype=float)
+        }
+
+    total_income = cube.total('income')
+    total_expense = abs(cube.total('expense'))
+
+    return {
+        'total_income': total_income,
+        'total_expense': total_expense,
+        'balance': total_income - total_expense,
+        'transaction_count': cube.rows,
+        'expense_by_category': cube.by_category('expense').abs(),
+        'income_by_category': cube.by_category('income')
+    }
+
+
+def goals_progress(cube):
+    """Автоматические цели: сократить расходы по каждой категории на 20%"""
+    if cube.rows == 0:
+        return []
+
+    expense_by_category = cube.by_category('expense').abs()
+    median = expense_by_category.median()
+
+    goals = []
+    for category, amount in expense_by_category.items():
+        target_amount = amount * 0.8  # Сократить на 20%
+        saved = amount - target_amount  # Уже "сэкономили" если тратим меньше
+
+        goals.append({
+            'name': f'Сократить {category}',
+            'category': category,
+            'current': amount,
+            'target': target_amount,
+            'saved': max(0, saved),
+            'priority': 'Высокий' if amount > median else 'Средний'
+        })
+
+    return goals
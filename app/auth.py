@@ -86,37 +86,7 @@ def show_auth_page():
                     "name": "Демо Пользователь",
                     "email": "demo@example.com"
                 }
-                # Добавляем демо-данные
-                st.session_state.goals = [
-                    {
-                        "id": 1,
-                        "name": "Новый iPhone",
-                        "amount": 100000,
-                        "saved": 25000,
-                        "priority": "Высокий",
-                        "target_date": "2024-12-31",
-                        "created": "2024-01-15",
-                        "active": True
-                    },
-                    {
-                        "id": 2,
-                        "name": "Отпуск в Турции",
-                        "amount": 150000,
-                        "saved": 50000,
-                        "priority": "Средний",
-                        "target_date": "2024-08-31",
-                        "created": "2024-01-10",
-                        "active": True
-                    }
-                ]
-                
-                st.session_state.transactions = [
-                    {"id": 1, "date": "2024-03-01", "amount": -1500, "category": "Кафе/Рестораны", "description": "Кофе и выпечка"},
-                    {"id": 2, "date": "2024-03-02", "amount": -3000, "category": "Продукты", "description": "Супермаркет"},
-                    {"id": 3, "date": "2024-03-03", "amount": 50000, "category": "Зарплата", "description": "ЗП март"},
-                    {"id": 4, "date": "2024-03-05", "amount": -8000, "category": "Развлечения", "description": "Кино и ужин"},
-                ]
-                
+                # Цели и операции — в GoalRepository и базе, а не в session_state
                 st.rerun()
         
         with col2:
@@ -126,6 +96,4 @@ def show_auth_page():
                     "name": "Новый Пользователь",
                     "email": "new@example.com"
                 }
-                st.session_state.goals = []
-                st.session_state.transactions = []
                 st.rerun()
\ No newline at end of file
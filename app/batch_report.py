@@ -0,0 +1,171 @@
+# app/batch_report.py
+"""Пакетный расчет отчетов для всех пользователей без Streamlit
+
+Считает те же показатели, что дашборд, автоматические цели и страница
+прогноза (по собственным целям пользователя из таблицы goals), для
+каждого user_id из таблицы transactions. Пользователи
+делятся между процессами пула; результат каждого пишется отдельным
+JSON-файлом, поэтому после сбоя уже готовые пропускаются.
+
+Запуск: python -m app.batch_report --db financial_assistant.db --out reports
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from app.aggregates import TransactionCube, financial_summary, goals_progress
+from app.forecast import current_rates, months_to_goal
+from app.goal_repository import GoalRepository
+from database import Database
+
+# Доходность по умолчанию, как на странице прогноза
+FORECAST_RETURN_RATE = 7.0
+
+_worker_db = None
+
+
+def _init_worker(db_path):
+    """Одно соединение с базой на процесс пула"""
+    global _worker_db
+    _worker_db = Database(db_path, pool_size=1)
+
+
+def report_path(out_dir, user_id):
+    return os.path.join(out_dir, f'user_{user_id}.json')
+
+
+def _series_dict(series):
+    return {str(key): float(value) for key, value in series.items()}
+
+
+def build_report(db, user_id, goals=None):
+    """Показатели одного пользователя в виде JSON-совместимого словаря
+
+    goals — цели пользователя (GoalRepository.for_users); None — прочитать из базы.
+    """
+    if goals is None:
+        goals = GoalRepository(db).for_users([user_id])[user_id]
+    # Куб из дневной свертки: строк на порядки меньше, чем транзакций
+    aggregates = TransactionCube.from_daily_rollup(db.get_rollup(user_id))
+
+    summary = financial_summary(aggregates)
+    monthly_income, monthly_expense, savings_rate = current_rates(aggregates)
+    monthly_input = savings_rate if savings_rate > 0 else 10000.0
+    # Все цели пользователя одним вызовом: months_to_goal работает с массивами
+    months = months_to_goal([goal['saved'] for goal in goals], [goal['amount'] for goal in goals],
+                            monthly_input, FORECAST_RETURN_RATE)
+
+    return {
+        'user_id': int(user_id),
+        'summary': {
+            'total_income': float(summary['total_income']),
+            'total_expense': float(summary['total_expense']),
+            'balance': float(summary['balance']),
+            'transaction_count': int(summary['transaction_count']),
+            'expense_by_category': _series_dict(summary['expense_by_category']),
+            'income_by_category': _series_dict(summary['income_by_category']),
+        },
+        'goals': [
+            {key: (float(value) if key in ('current', 'target', 'saved') else value)
+             for key, value in goal.items()}
+            for goal in goals_progress(aggregates)
+        ],
+        'forecast': {
+            'monthly_income': float(monthly_income),
+            'monthly_expense': float(monthly_expense),
+            'savings_rate': float(savings_rate),
+            'return_rate': FORECAST_RETURN_RATE,
+            'goals': [
+                {'id': goal['id'], 'name': goal['name'], 'amount': float(goal['amount']),
+                 'saved': float(goal['saved']), 'months_to_goal': float(goal_months)}
+                for goal, goal_months in zip(goals, months)
+            ],
+        },
+    }
+
+
+def _write_atomic(path, payload):
+    """Запись через временный файл: недописанный отчет не считается готовым"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def process_users(user_ids, out_dir):
+    """Задача процесса пула: отчеты для части пользователей"""
+    # Цели всего пакета — одним запросом
+    goals = GoalRepository(_worker_db).for_users(user_ids)
+    done = 0
+    for user_id in user_ids:
+        _write_atomic(report_path(out_dir, user_id), build_report(_worker_db, user_id, goals[user_id]))
+        done += 1
+    return done
+
+
+def partition(user_ids, parts):
+    """Разбиение пользователей на части по user_id % parts"""
+    buckets = [[] for _ in range(parts)]
+    for user_id in user_ids:
+        buckets[user_id % parts].append(user_id)
+    return [bucket for bucket in buckets if bucket]
+
+
+def run(db_path, out_dir, workers=None, batch_size=50, resume=True):
+    """Отчеты для всех пользователей; возвращает статистику прогона"""
+    started = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    db = Database(db_path, pool_size=1)
+    user_ids = [row[0] for row in db.execute_query(
+        "SELECT DISTINCT user_id FROM transactions ORDER BY user_id"
+    )]
+    db.close()
+
+    pending = [
+        user_id for user_id in user_ids
+        if not (resume and os.path.exists(report_path(out_dir, user_id)))
+    ]
+
+    # Мелкие пакеты внутри каждой части, чтобы процессы не простаивали в конце
+    tasks = []
+    for bucket in partition(pending, workers):
+        tasks.extend(bucket[i:i + batch_size] for i in range(0, len(bucket), batch_size))
+
+    written = 0
+    if tasks:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(db_path,)) as pool:
+            futures = [pool.submit(process_users, task, out_dir) for task in tasks]
+            for future in as_completed(futures):
+                written += future.result()
+
+    return {
+        'users': len(user_ids),
+        'skipped': len(user_ids) - len(pending),
+        'written': written,
+        'workers': workers,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетные отчеты по всем пользователям")
+    parser.add_argument('--db', default='financial_assistant.db')
+    parser.add_argument('--out', default='reports')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--no-resume', action='store_true', help="пересчитать и готовые отчеты")
+    args = parser.parse_args(argv)
+
+    stats = run(args.db, args.out, args.workers, args.batch_size, resume=not args.no_resume)
+    print(f"Пользователей: {stats['users']}, готово ранее: {stats['skipped']}, "
+          f"записано: {stats['written']}, процессов: {stats['workers']}, "
+          f"{stats['seconds']:.2f} с")
+
+
+if __name__ == "__main__":
+    main()
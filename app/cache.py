@@ -0,0 +1,253 @@
+# app/cache.py
+"""Дисковый колоночный кэш набора транзакций (.npy + meta.json)
+
+Каждая колонка хранится отдельным .npy файлом, поэтому при тёплом старте
+её можно отобразить в память (mmap) вместо повторного разбора JSON.
+Файлы колонок не перезаписываются: каждая сборка пишет новый каталог
+data-<n>, а meta.json атомарно переключается на него. Уже отображённые
+в память массивы прежней сборки остаются валидными.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.loader import load_transactions
+
+# Меняется при изменении формата кэша — старые кэши перестраиваются
+CACHE_FORMAT = 2
+META_FILE = 'meta.json'
+DATA_PREFIX = 'data-'
+HASH_BLOCK = 1 << 20
+
+
+def cache_dir_for(path):
+    """Каталог кэша рядом с исходным файлом: data/.cache/<имя файла>"""
+    folder, name = os.path.split(os.path.abspath(path))
+    return os.path.join(folder, '.cache', name)
+
+
+def file_hash(path):
+    """SHA-256 содержимого файла, читаем блоками"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_fingerprint(path, with_hash=False):
+    """Отпечаток источника: mtime, размер и (по запросу) хэш"""
+    st = os.stat(path)
+    fingerprint = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+    if with_hash:
+        fingerprint['sha256'] = file_hash(path)
+    return fingerprint
+
+
+def read_meta(cache_dir):
+    """Чтение meta.json, None если кэша нет или он битый"""
+    try:
+        with open(os.path.join(cache_dir, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('format') != CACHE_FORMAT:
+        return None
+    return meta
+
+
+def _write_meta(cache_dir, meta):
+    tmp_path = os.path.join(cache_dir, META_FILE + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, os.path.join(cache_dir, META_FILE))
+
+
+def _remove_old_data(cache_dir, keep):
+    """Удаление прежних сборок, кроме keep
+
+    Удаление (unlink) не трогает уже отображённые в память файлы — в
+    отличие от перезаписи, которая обрезает их и роняет читателя (SIGBUS).
+    """
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name in keep or name == META_FILE:
+            continue
+        if name.startswith(DATA_PREFIX) and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif name.endswith('.npy'):
+            # Колонки формата 1 лежали прямо в каталоге кэша
+            os.remove(path)
+
+
+def write_cache(df, cache_dir, fingerprint, load_stats=None):
+    """Запись DataFrame в новый каталог сборки по колонкам
+
+    meta.json заменяется последним (os.replace) и указывает на готовую
+    сборку; до этого читатели видят прежнюю.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    previous = read_meta(cache_dir)
+    data_dir = tempfile.mkdtemp(prefix=DATA_PREFIX, dir=cache_dir)
+
+    columns = []
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        base = f'col{i}'
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            kind = 'category'
+            codes, categories = series.cat.codes.to_numpy(), series.cat.categories
+        elif pd.api.types.is_datetime64_dtype(series.dtype):
+            kind = 'datetime'
+            np.save(os.path.join(data_dir, base + '.npy'), series.to_numpy().view('int64'))
+            columns.append({'name': col, 'kind': kind, 'file': base, 'dtype': str(series.dtype)})
+            continue
+        elif pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+            kind = 'numeric'
+            np.save(os.path.join(data_dir, base + '.npy'), series.to_numpy())
+            columns.append({'name': col, 'kind': kind, 'file': base, 'dtype': str(series.dtype)})
+            continue
+        else:
+            # Строки храним словарём: уникальные значения + коды (без pickle)
+            kind = 'object'
+            codes, categories = pd.factorize(series, use_na_sentinel=True)
+
+        np.save(os.path.join(data_dir, base + '.npy'), np.asarray(codes))
+        np.save(
+            os.path.join(data_dir, base + '.values.npy'),
+            np.asarray([str(v) for v in categories], dtype=str)
+        )
+        columns.append({'name': col, 'kind': kind, 'file': base, 'dtype': str(series.dtype)})
+
+    meta = {
+        'format': CACHE_FORMAT,
+        'data': os.path.basename(data_dir),
+        'rows': len(df),
+        'columns': columns,
+        'source': fingerprint,
+        'built_at': time.time(),
+        'load_stats': {k: v for k, v in (load_stats or {}).items() if k != 'path'},
+    }
+    _write_meta(cache_dir, meta)
+    # Прежнюю сборку оставляем: её meta мог только что прочитать другой процесс
+    _remove_old_data(cache_dir, {meta['data'], previous and previous.get('data')})
+    return meta
+
+
+def read_cache(cache_dir, meta, mmap=True):
+    """Сборка DataFrame из .npy файлов, числовые колонки через mmap"""
+    mmap_mode = 'r' if mmap else None
+    data_dir = os.path.join(cache_dir, meta['data'])
+    data = {}
+    for column in meta['columns']:
+        path = os.path.join(data_dir, column['file'] + '.npy')
+        values = np.load(path, mmap_mode=mmap_mode)
+
+        if column['kind'] == 'numeric':
+            data[column['name']] = values
+        elif column['kind'] == 'datetime':
+            data[column['name']] = values.view(column['dtype'])
+        else:
+            labels = np.load(os.path.join(data_dir, column['file'] + '.values.npy'))
+            codes = np.asarray(values)
+            if column['kind'] == 'category':
+                data[column['name']] = pd.Categorical.from_codes(codes, labels.tolist())
+            else:
+                decoded = labels.astype(object)[codes] if len(labels) else np.full(len(codes), None, dtype=object)
+                if len(labels):
+                    decoded[codes < 0] = None
+                data[column['name']] = decoded
+    return pd.DataFrame(data, copy=False)
+
+
+def load_cached(path, cache_dir=None, mmap=True):
+    """Загрузка транзакций через дисковый кэш
+
+    Возвращает (df, stats); stats['cache'] — 'hit', 'revalidated' (mtime
+    изменился, содержимое нет) или 'miss' (кэш перестроен).
+    """
+    started = time.perf_counter()
+    cache_dir = cache_dir or cache_dir_for(path)
+    fingerprint = source_fingerprint(path)
+    meta = read_meta(cache_dir)
+    status = 'miss'
+
+    if meta is not None:
+        cached = meta['source']
+        if cached['mtime_ns'] == fingerprint['mtime_ns'] and cached['size'] == fingerprint['size']:
+            status = 'hit'
+        elif cached['size'] == fingerprint['size']:
+            # Файл «тронули», но содержимое могло не измениться
+            fingerprint['sha256'] = file_hash(path)
+            if fingerprint['sha256'] == cached.get('sha256'):
+                status = 'revalidated'
+                meta['source'] = fingerprint
+                _write_meta(cache_dir, meta)
+
+    if status == 'miss':
+        df, load_stats = load_transactions(path)
+        fingerprint.setdefault('sha256', file_hash(path))
+        meta = write_cache(df, cache_dir, fingerprint, load_stats)
+        if mmap:
+            # Отдаём тот же вид, что и при тёплом старте
+            df = read_cache(cache_dir, meta, mmap=True)
+    else:
+        df = read_cache(cache_dir, meta, mmap=mmap)
+
+    stats = {
+        'path': path,
+        'cache': status,
+        'cache_dir': cache_dir,
+        'rows': meta['rows'],
+        'bytes': meta['source']['size'],
+        'version': f"{meta['source']['sha256'][:16]}-{meta['source']['size']}",
+        'seconds': time.perf_counter() - started,
+    }
+    return df, stats
+
+
+def cache_status(path, cache_dir=None):
+    """Состояние кэша без загрузки данных"""
+    cache_dir = cache_dir or cache_dir_for(path)
+    meta = read_meta(cache_dir)
+    if meta is None:
+        return 'missing'
+    fingerprint = source_fingerprint(path)
+    cached = meta['source']
+    if cached['mtime_ns'] == fingerprint['mtime_ns'] and cached['size'] == fingerprint['size']:
+        return 'fresh'
+    return 'stale'
+
+
+def main(argv=None):
+    """CLI: предварительная сборка кэша при деплое"""
+    parser = argparse.ArgumentParser(description="Колоночный кэш транзакций")
+    parser.add_argument('command', choices=['build', 'status', 'clear'])
+    parser.add_argument('paths', nargs='*', default=['data/csvjson.json'])
+    parser.add_argument('--force', action='store_true', help="перестроить даже свежий кэш")
+    args = parser.parse_args(argv)
+
+    for path in args.paths:
+        cache_dir = cache_dir_for(path)
+        if args.command == 'status':
+            print(f"{path}: {cache_status(path)} ({cache_dir})")
+        elif args.command == 'clear':
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            print(f"{path}: кэш удалён")
+        else:
+            if args.force:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            _, stats = load_cached(path)
+            print(f"{path}: {stats['cache']}, {stats['rows']:,} строк, "
+                  f"{stats['bytes']:,} байт, {stats['seconds']:.3f} с")
+
+
+if __name__ == "__main__":
+    main()
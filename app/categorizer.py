@@ -0,0 +1,363 @@
+# app/categorizer.py
+"""Автоматическая категоризация транзакций по правилам
+
+Правила пользователя (таблица category_rules: подстрока или регулярное
+выражение -> категория, необязательный тип операции, приоритет)
+компилируются один раз на набор. Подстроки сводятся в префиксное дерево и
+из него — в одно регулярное выражение: поиск по описанию находит позиции,
+где начинается хоть одна подстрока правила, а все подстроки с этой позиции
+собираются спуском по тому же дереву. Регулярные правила собраны в
+одно выражение на тип: альтернативы по убыванию приоритета, каждая —
+просмотр вперед от начала строки, так что re.match сразу дает правило с
+наибольшим приоритетом. Побеждает правило с большим priority, при равенстве
+— более раннее. Поэтому в регулярных правилах нельзя глобальные флаги,
+именованные группы и ссылки на группы по номеру — validate_rule
+компилирует правило в том же виде, в каком оно встраивается.
+
+Классифицируются только уникальные пары (описание, тип), результат
+раскладывается на все строки. Правила трогают лишь строки, которые не
+введены вручную и либо назначены правилом (rule_id), либо остались без
+категории (UNCATEGORIZED). После правки правила переклассифицируются только
+группы, назначенные этим правилом или подходящие под его старый или новый
+шаблон, а не вся история.
+
+Запуск: python -m app.categorizer apply --user-id 1
+"""
+import argparse
+import re
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from app.importer import OTHER_CATEGORY
+
+UNCATEGORIZED = OTHER_CATEGORY
+TYPES = ('expense', 'income', 'transfer')
+RULE_KINDS = ('substring', 'regex')
+UPDATE_BATCH = 5000
+
+_RULE_COLUMNS = 'id, user_id, pattern, kind, category, type, priority'
+_REGEX_FLAGS = re.IGNORECASE | re.DOTALL
+
+# Флаги вида (?i) действуют на все выражение, а не на правило
+_GLOBAL_FLAGS = re.compile(r'(?:^|[^\\])(?:\\\\)*\(\?[aiLmsux]+\)')
+# Номер группы зависит от соседних правил в общем выражении: \1, (?(1)...)
+_NUMBERED_REFERENCE = re.compile(r'(?:^|[^\\])(?:\\\\)*\\[1-9]|\(\?\(\d')
+
+# Группы строк, которые может менять автомат
+_GROUPS_SQL = """
+    SELECT description, type, category, rule_id, COUNT(*) AS rows FROM transactions
+    WHERE user_id = ? AND COALESCE(is_manual, 0) = 0 AND (rule_id IS NOT NULL OR category = ?)
+    GROUP BY description, type, category, rule_id
+"""
+
+_UPDATE_SQL = """
+    UPDATE transactions SET category = ?, rule_id = ?
+    WHERE user_id = ? AND description IS ? AND type IS ? AND category = ? AND rule_id IS ?
+      AND COALESCE(is_manual, 0) = 0 AND (rule_id IS NOT NULL OR category = ?)
+"""
+
+
+def _priority(rule):
+    """Ключ сортировки: больший priority, затем меньший id"""
+    return -rule['priority'], rule['id']
+
+
+def _trie_regex(node):
+    """Выражение для префиксного дерева {символ: поддерево, '': подстрока, кончающаяся здесь}
+
+    Конец подстроки — ленивое '??': поиску достаточно кратчайшей подстроки,
+    чтобы найти позицию.
+    """
+    parts = [re.escape(char) + _trie_regex(child) for char, child in sorted(node.items()) if char]
+    if not parts:
+        return ''
+    pattern = parts[0] if len(parts) == 1 else f"(?:{'|'.join(parts)})"
+    return f"(?:{pattern})??" if '' in node else pattern
+
+
+def _embed(pattern, number):
+    """Регулярное правило как альтернатива общего выражения: просмотр вперед с группой r<number>"""
+    return f"(?=.*?(?P<r{number}>(?:{pattern})))"
+
+
+def _compile(pattern):
+    """re.compile с флагами правил; ошибка (и устаревшие глобальные флаги) — ValueError"""
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', DeprecationWarning)
+            return re.compile(pattern, _REGEX_FLAGS)
+    except (re.error, DeprecationWarning) as e:
+        raise ValueError(f"Ошибка в выражении: {e}") from e
+
+
+def validate_rule(pattern, kind='substring', category=None, tx_type=None):
+    """ValueError, если правило нельзя скомпилировать или сохранить"""
+    if kind not in RULE_KINDS:
+        raise ValueError(f"Неизвестный вид правила: {kind}")
+    if not pattern or not pattern.strip():
+        raise ValueError("Пустой шаблон")
+    if category is not None and not category.strip():
+        raise ValueError("Пустая категория")
+    if tx_type is not None and tx_type not in TYPES:
+        raise ValueError(f"Неизвестный тип: {tx_type}")
+    if kind == 'regex':
+        # Проверяется тот же вид, в котором правило встраивается в RuleSet
+        if _GLOBAL_FLAGS.search(pattern):
+            raise ValueError("Глобальные флаги вида (?i) в правиле не поддерживаются, "
+                             "используйте (?i:...)")
+        if _NUMBERED_REFERENCE.search(pattern):
+            raise ValueError("Ссылки на группы по номеру в правиле не поддерживаются")
+        # Само по себе выражение должно быть целым: иначе скобки вида "a)(" выходят за обертку
+        _compile(pattern)
+        compiled = _compile(_embed(pattern, 0))
+        if set(compiled.groupindex) != {'r0'}:
+            raise ValueError("Именованные группы в правиле не поддерживаются")
+
+
+class RuleSet:
+    """Скомпилированный набор правил: дерево подстрок и выражение регулярных правил"""
+
+    def __init__(self, rules):
+        self.rules = {rule['id']: rule for rule in rules}
+
+        # Подстрока -> правила с ней по приоритету
+        self._needles = {}
+        for rule in sorted(rules, key=_priority):
+            if rule['kind'] == 'substring':
+                self._needles.setdefault(rule['pattern'].strip().lower(), []).append(rule)
+        trie = {}
+        for needle in self._needles:
+            node = trie
+            for char in needle:
+                node = node.setdefault(char, {})
+            node[''] = needle
+        self._trie = re.compile(_trie_regex(trie), re.DOTALL) if trie else None
+        self._root = trie
+
+        self._patterns = {}
+        regex_rules = sorted((rule for rule in rules if rule['kind'] == 'regex'), key=_priority)
+        for tx_type in TYPES:
+            alternatives = [_embed(rule['pattern'], rule['id'])
+                            for rule in regex_rules if rule['type'] in (None, tx_type)]
+            self._patterns[tx_type] = _compile('|'.join(alternatives)) if alternatives else None
+
+    def __len__(self):
+        return len(self.rules)
+
+    def match(self, description, tx_type='expense'):
+        """id правила с наибольшим приоритетом или None"""
+        if not description:
+            return None
+        best = None
+
+        if self._trie is not None:
+            text = description.lower()
+            found = self._trie.search(text)
+            while found:
+                # Все подстроки с этого места — спуском по дереву
+                start = found.start()
+                node = self._root
+                for char in text[start:]:
+                    node = node.get(char)
+                    if node is None:
+                        break
+                    if '' in node:
+                        rule = next((rule for rule in self._needles[node['']]
+                                     if rule['type'] in (None, tx_type)), None)
+                        if rule is not None and (best is None or _priority(rule) < _priority(best)):
+                            best = rule
+                found = self._trie.search(text, start + 1)
+
+        pattern = self._patterns.get(tx_type)
+        found = pattern.match(description) if pattern is not None else None
+        if found:
+            rule = self.rules[int(found.lastgroup[1:])]
+            if best is None or _priority(rule) < _priority(best):
+                best = rule
+        return best['id'] if best is not None else None
+
+    def classify(self, descriptions, types=None):
+        """(категории, id правил) для колонки описаний; None — ни одно правило не подошло
+
+        Выражения выполняются один раз на уникальную пару (описание, тип).
+        """
+        description_codes, descriptions = pd.factorize(pd.Series(descriptions, dtype=object).fillna(''))
+        if types is None:
+            type_codes, types = np.zeros(len(description_codes), dtype='int64'), ['expense']
+        else:
+            type_codes, types = pd.factorize(pd.Series(types, dtype=object), use_na_sentinel=False)
+        # Пара (описание, тип) — одно целое число
+        codes, pairs = pd.factorize(description_codes * len(types) + type_codes)
+
+        rule_ids = [self.match(descriptions[pair // len(types)], types[pair % len(types)]) for pair in pairs]
+        categories = [self.rules[rule_id]['category'] if rule_id is not None else None
+                      for rule_id in rule_ids]
+        return (pd.Series(categories, dtype=object).take(codes).reset_index(drop=True),
+                pd.Series(rule_ids, dtype=object).take(codes).reset_index(drop=True))
+
+
+class RuleCategorizer:
+    """Правила пользователя в category_rules и запись категорий в transactions"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def rules(self, user_id):
+        rows = self.db.execute_query(
+            f"SELECT {_RULE_COLUMNS} FROM category_rules WHERE user_id = ? ORDER BY priority DESC, id",
+            (user_id,)
+        )
+        return [dict(zip(('id', 'user_id', 'pattern', 'kind', 'category', 'type', 'priority'), row))
+                for row in rows]
+
+    def rule_set(self, user_id):
+        return RuleSet(self.rules(user_id))
+
+    def add_rule(self, user_id, pattern, category, kind='substring', tx_type=None, priority=0):
+        """Новое правило и переклассификация подходящих под него строк: (id, stats)"""
+        validate_rule(pattern, kind, category, tx_type)
+        with self.db.get_connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO category_rules (user_id, pattern, kind, category, type, priority) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (user_id, pattern, kind, category.strip(), tx_type, int(priority))
+            )
+            conn.commit()
+        rule_id = cursor.lastrowid
+        return rule_id, self.reclassify(user_id, changed=[self._rule(user_id, rule_id)])
+
+    def update_rule(self, user_id, rule_id, **fields):
+        """Изменить pattern/kind/category/type/priority; затрагиваются строки старого и нового шаблона"""
+        old = self._rule(user_id, rule_id)
+        if old is None:
+            raise ValueError(f"Нет правила {rule_id}")
+        fields = {key: value for key, value in fields.items()
+                  if key in ('pattern', 'kind', 'category', 'type', 'priority')}
+        new = {**old, **fields}
+        validate_rule(new['pattern'], new['kind'], new['category'], new['type'])
+        if fields:
+            with self.db.get_connection() as conn:
+                conn.execute(
+                    f"UPDATE category_rules SET {', '.join(f'{key} = ?' for key in fields)} "
+                    "WHERE id = ? AND user_id = ?",
+                    (*fields.values(), rule_id, user_id)
+                )
+                conn.commit()
+        return self.reclassify(user_id, changed=[old, new])
+
+    def delete_rule(self, user_id, rule_id):
+        """Удалить правило; его строки получают следующее подходящее правило или UNCATEGORIZED"""
+        old = self._rule(user_id, rule_id)
+        if old is None:
+            return None
+        with self.db.get_connection() as conn:
+            conn.execute("DELETE FROM category_rules WHERE id = ? AND user_id = ?", (rule_id, user_id))
+            conn.commit()
+        return self.reclassify(user_id, changed=[old])
+
+    def _rule(self, user_id, rule_id):
+        for rule in self.rules(user_id):
+            if rule['id'] == rule_id:
+                return rule
+        return None
+
+    def reclassify(self, user_id, changed=None):
+        """Пересчитать категории строк пользователя
+
+        changed=None — все группы, которые может менять автомат; иначе —
+        только назначенные правилами из changed или подходящие под их
+        шаблоны. Возвращает статистику со скоростью.
+        """
+        started = time.perf_counter()
+        rule_set = self.rule_set(user_id)
+        groups = self.db.get_dataframe(_GROUPS_SQL, (user_id, UNCATEGORIZED))
+        groups['rule_id'] = pd.Series([None if pd.isna(value) else int(value) for value in groups['rule_id']],
+                                      dtype=object)
+
+        if changed is not None and not groups.empty:
+            changed_ids = {rule['id'] for rule in changed}
+            # Старая и новая версии одного правила — разные альтернативы фильтра
+            probe = RuleSet([{**rule, 'id': number} for number, rule in enumerate(changed)])
+            _, matched = probe.classify(groups['description'], groups['type'])
+            affected = groups['rule_id'].isin(changed_ids) | matched.notna().to_numpy()
+            groups = groups[affected.to_numpy()].reset_index(drop=True)
+
+        categories, rule_ids = rule_set.classify(groups['description'], groups['type'])
+        updates = [
+            (new_category or UNCATEGORIZED, new_rule, user_id, description, tx_type, old_category, old_rule,
+             UNCATEGORIZED)
+            for description, tx_type, old_category, old_rule, new_category, new_rule
+            in zip(groups['description'], groups['type'], groups['category'], groups['rule_id'],
+                   categories, rule_ids)
+            if (new_category or UNCATEGORIZED, new_rule) != (old_category, old_rule)
+        ]
+
+        updated = 0
+        with self.db.get_connection() as conn:
+            for start in range(0, len(updates), UPDATE_BATCH):
+                try:
+                    # Триггер UPDATE OF category поддерживает свертки
+                    cursor = conn.executemany(_UPDATE_SQL, updates[start:start + UPDATE_BATCH])
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                updated += cursor.rowcount
+
+        seconds = time.perf_counter() - started
+        return {
+            'rules': len(rule_set),
+            'groups': len(groups),
+            'rows': int(groups['rows'].sum()) if len(groups) else 0,
+            'changed_groups': len(updates),
+            'updated': updated,
+            'seconds': seconds,
+            'groups_per_sec': len(groups) / seconds if seconds > 0 else 0.0,
+        }
+
+
+def main(argv=None):
+    from database import Database
+
+    parser = argparse.ArgumentParser(description="Правила автокатегоризации транзакций")
+    parser.add_argument('command', choices=('list', 'add', 'delete', 'apply'))
+    parser.add_argument('--db', default='financial_assistant.db')
+    parser.add_argument('--user-id', type=int, default=1)
+    parser.add_argument('--pattern')
+    parser.add_argument('--category')
+    parser.add_argument('--kind', choices=RULE_KINDS, default='substring')
+    parser.add_argument('--type', choices=TYPES, default=None)
+    parser.add_argument('--priority', type=int, default=0)
+    parser.add_argument('--id', type=int, help="id правила для delete")
+    args = parser.parse_args(argv)
+
+    categorizer = RuleCategorizer(Database(args.db))
+    if args.command == 'list':
+        for rule in categorizer.rules(args.user_id):
+            print(f"{rule['id']:5d}  [{rule['priority']:3d}] {rule['kind']:9s} {rule['pattern']!r} -> "
+                  f"{rule['category']}{' (' + rule['type'] + ')' if rule['type'] else ''}")
+        return
+
+    if args.command == 'add':
+        if not args.pattern or not args.category:
+            parser.error("для add нужны --pattern и --category")
+        rule_id, stats = categorizer.add_rule(args.user_id, args.pattern, args.category,
+                                              args.kind, args.type, args.priority)
+        print(f"Правило {rule_id}")
+    elif args.command == 'delete':
+        if args.id is None:
+            parser.error("для delete нужен --id")
+        stats = categorizer.delete_rule(args.user_id, args.id)
+        if stats is None:
+            parser.error(f"нет правила {args.id}")
+    else:
+        stats = categorizer.reclassify(args.user_id)
+    print(f"Групп (описание, тип): {stats['groups']:,} ({stats['rows']:,} строк), "
+          f"изменено {stats['updated']:,} строк за {stats['seconds']:.2f} с")
+
+
+if __name__ == "__main__":
+    main()
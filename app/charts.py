@@ -0,0 +1,86 @@
+# app/charts.py
+"""Графики дашборда и страницы анализа на plotly
+
+Фигуры строятся из срезов куба агрегатов и возвращаются готовыми
+словарями спецификации plotly: их можно один раз положить в кэш на
+версию данных и отдавать st.plotly_chart на каждом перезапуске без
+повторного построения и растеризации. Длинные ряды прореживаются до
+MAX_POINTS точек.
+"""
+import math
+
+import pandas as pd
+import plotly.graph_objects as go
+
+# Не больше стольких точек на линию и секторов в круговой диаграмме
+MAX_POINTS = 120
+MAX_SLICES = 10
+OTHER_LABEL = 'Другое'
+
+
+def downsample_monthly(monthly, max_points=MAX_POINTS):
+    """Помесячная сводка, сжатая до max_points точек
+
+    Соседние месяцы объединяются в интервалы по k месяцев; значение —
+    среднее за месяц внутри интервала, подпись — первый месяц интервала.
+    """
+    if len(monthly) <= max_points:
+        return monthly
+    step = math.ceil(len(monthly) / max_points)
+    buckets = pd.Series(range(len(monthly)), index=monthly.index) // step
+    result = monthly.groupby(buckets.to_numpy()).mean()
+    result.index = monthly.index[::step]
+    return result
+
+
+def expense_pie(expense_by_category, max_slices=MAX_SLICES):
+    """Круговая диаграмма расходов; мелкие категории сводятся в 'Другое'"""
+    values = expense_by_category.abs().sort_values(ascending=False)
+    if len(values) > max_slices:
+        head = values.iloc[:max_slices - 1]
+        values = pd.concat([head, pd.Series({OTHER_LABEL: values.iloc[max_slices - 1:].sum()})])
+
+    fig = go.Figure(go.Pie(
+        labels=values.index.astype(str).tolist(),
+        values=values.to_numpy().round(2).tolist(),
+        textinfo='percent',
+        sort=False,
+        direction='clockwise',
+        rotation=90,
+    ))
+    fig.update_layout(title='Распределение расходов', margin=dict(t=50, b=10, l=10, r=10))
+    return fig.to_dict()
+
+
+def monthly_lines(monthly, max_points=MAX_POINTS):
+    """Линии доходов и расходов по месяцам"""
+    monthly = downsample_monthly(monthly, max_points)
+    months = monthly.index.astype(str).tolist()
+
+    fig = go.Figure()
+    if 'income' in monthly.columns:
+        fig.add_trace(go.Scatter(x=months, y=monthly['income'].round(2).tolist(),
+                                 name='Доходы', mode='lines+markers'))
+    if 'expense' in monthly.columns:
+        fig.add_trace(go.Scatter(x=months, y=monthly['expense'].abs().round(2).tolist(),
+                                 name='Расходы', mode='lines+markers', marker_symbol='square'))
+    fig.update_layout(
+        title='Динамика доходов и расходов',
+        xaxis_title='Месяц',
+        yaxis_title='Сумма (руб)',
+        hovermode='x unified',
+        margin=dict(t=50, b=10, l=10, r=10),
+    )
+    return fig.to_dict()
+
+
+def build_charts(aggregates):
+    """Все графики одной версии данных: имя -> спецификация фигуры"""
+    charts = {}
+    expense_by_category = aggregates.by_category('expense')
+    if not expense_by_category.empty:
+        charts['expense_pie'] = expense_pie(expense_by_category)
+    monthly = aggregates.monthly()
+    if not monthly.empty:
+        charts['monthly_lines'] = monthly_lines(monthly)
+    return charts
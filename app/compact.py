@@ -0,0 +1,173 @@
+# app/compact.py
+"""Компактное представление набора транзакций в памяти
+
+CompactTransactions хранит колонки массивами минимального размера:
+сумма — int64 в копейках, дата — int32 номер дня от 1970-01-01,
+категория, тип и описание — коды pd.Categorical (уникальные описания
+интернированы и хранятся один раз). Для таблиц страниц из нужных строк
+собирается обычный DataFrame (to_frame), куб агрегатов строится прямо из
+кодов (TransactionCube.from_compact).
+
+Отчет о памяти: python -m app.compact data/csvjson.json
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Номер дня для пропущенной даты (NaT)
+MISSING_DAY = np.iinfo(np.int32).min
+
+
+def _categorical(values, intern=False):
+    """Столбец в Categorical; строки категорий — интернированные Python str"""
+    categorical = pd.Categorical(values)
+    if intern:
+        categories = [sys.intern(str(value)) for value in categorical.categories]
+        categorical = categorical.rename_categories(pd.Index(categories, dtype=object))
+    return categorical
+
+
+class CompactTransactions:
+    """Транзакции: amount_kop, day, category, type, description"""
+
+    def __init__(self, amount_kop, day, category, tx_type, description):
+        self.amount_kop = amount_kop
+        self.day = day
+        self.category = category
+        self.type = tx_type
+        self.description = description
+
+    @classmethod
+    def from_frame(cls, df):
+        """Из DataFrame загрузчика (amount, category, date, type[, description])
+
+        Строки без суммы (NaN) отбрасываются: в копейках их не представить,
+        и в куб и счетчики они не попадают.
+        """
+        amount = df['amount'].to_numpy(dtype='float64')
+        missing = np.isnan(amount)
+        if missing.any():
+            df, amount = df[~missing], amount[~missing]
+        amount_kop = np.rint(amount * 100).astype('int64')
+
+        dates = df['date'].to_numpy().astype('datetime64[D]')
+        day = dates.astype('int64')
+        day[np.isnat(dates)] = MISSING_DAY
+        day = day.astype('int32')
+
+        if 'description' in df.columns:
+            description = _categorical(df['description'].fillna(''), intern=True)
+        else:
+            description = pd.Categorical.from_codes(np.zeros(len(df), dtype='int8'), categories=[''])
+        return cls(amount_kop, day, _categorical(df['category']), _categorical(df['type']), description)
+
+    def __len__(self):
+        return len(self.amount_kop)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def dates(self, index=None):
+        """datetime64[ns] по номерам дней (всем или выбранным строкам)"""
+        day = self.day if index is None else self.day[index]
+        dates = day.astype('int64').astype('datetime64[D]')
+        dates[day == MISSING_DAY] = np.datetime64('NaT')
+        return dates.astype('datetime64[ns]')
+
+    def to_frame(self, index=None):
+        """Обычный DataFrame (amount, category, date, type, description) для таблиц страниц"""
+        index = np.arange(len(self)) if index is None else np.asarray(index)
+        return pd.DataFrame({
+            'amount': self.amount_kop[index] / 100,
+            'category': self.category.take(index),
+            'date': self.dates(index),
+            'type': self.type.take(index),
+            'description': np.asarray(self.description.take(index), dtype=object),
+        })
+
+    def recent(self, n=10):
+        """Позиции n последних по дате строк, новые первыми"""
+        if len(self) <= n:
+            return np.argsort(-self.day.astype('int64'), kind='stable')
+        last = np.argpartition(self.day, len(self) - n)[len(self) - n:]
+        return last[np.argsort(-self.day[last].astype('int64'), kind='stable')]
+
+    def append(self, other):
+        """Новый набор из двух (категории объединяются)"""
+        def union(left, right):
+            return union_categoricals([left, right], sort_categories=True)
+
+        return CompactTransactions(
+            np.concatenate([self.amount_kop, other.amount_kop]),
+            np.concatenate([self.day, other.day]),
+            union(self.category, other.category),
+            union(self.type, other.type),
+            union(self.description, other.description),
+        )
+
+    def freeze(self):
+        """Массивы только для чтения: общий набор нельзя изменить на месте"""
+        for array in (self.amount_kop, self.day, self.category.codes,
+                      self.type.codes, self.description.codes):
+            array.flags.writeable = False
+        return self
+
+    def memory_usage(self, deep=True, index=True):
+        """Байты по колонкам (как DataFrame.memory_usage); коды + уникальные значения"""
+        def categorical_bytes(categorical):
+            size = categorical.codes.nbytes
+            if deep:
+                size += sum(sys.getsizeof(value) for value in categorical.categories)
+            return size
+
+        return pd.Series({
+            'amount_kop': self.amount_kop.nbytes,
+            'day': self.day.nbytes,
+            'category': categorical_bytes(self.category),
+            'type': categorical_bytes(self.type),
+            'description': categorical_bytes(self.description),
+        })
+
+
+def memory_report(df, compact=None):
+    """Байты на строку по колонкам до и после сжатия"""
+    compact = compact or CompactTransactions.from_frame(df)
+    rows = max(len(df), 1)
+    before = df.memory_usage(deep=True, index=False)
+    after = compact.memory_usage(deep=True)
+    return {
+        'rows': len(df),
+        'before': {name: int(size) for name, size in before.items()},
+        'after': {name: int(size) for name, size in after.items()},
+        'bytes_per_row_before': before.sum() / rows,
+        'bytes_per_row_after': after.sum() / rows,
+        'ratio': before.sum() / max(after.sum(), 1),
+    }
+
+
+def main(argv=None):
+    from app.loader import load_transactions
+
+    parser = argparse.ArgumentParser(description="Память набора транзакций до и после сжатия")
+    parser.add_argument('paths', nargs='+')
+    args = parser.parse_args(argv)
+
+    for path in args.paths:
+        df, _ = load_transactions(path)
+        # Исходный вид: строки объектами, как в DataFrame из json
+        plain = df.astype({'category': object, 'type': object})
+        if 'description' in plain.columns:
+            plain['description'] = plain['description'].astype(object)
+        report = memory_report(plain)
+        print(f"{path}: {report['rows']:,} строк")
+        print(f"  до:    {report['bytes_per_row_before']:7.1f} байт/строку  {report['before']}")
+        print(f"  после: {report['bytes_per_row_after']:7.1f} байт/строку  {report['after']}")
+        print(f"  x{report['ratio']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
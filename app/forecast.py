@@ -0,0 +1,91 @@
+# app/forecast.py
+"""Прогноз достижения целей: аннуитет в замкнутой форме
+
+Баланс через n месяцев при взносе P и месячной доходности r:
+    FV(n) = S·(1+r)^n + P·((1+r)^n − 1) / r
+Срок до цели G — наименьшее целое n, при котором FV(n) ≥ G:
+    n = ⌈ log((G·r + P) / (S·r + P)) / log(1 + r) ⌉
+Все функции принимают массивы и считают сетки целей сразу через NumPy.
+"""
+import numpy as np
+import pandas as pd
+
+# Тот же предел, что и у прежнего помесячного цикла (50 лет)
+MAX_MONTHS = 600
+
+
+def current_rates(aggregates, months=3):
+    """Средние доход, расход и накопление в месяц (данные за months месяцев)"""
+    monthly_income = aggregates.total('income') / months
+    monthly_expense = abs(aggregates.total('expense')) / months
+    return monthly_income, monthly_expense, monthly_income - monthly_expense
+
+
+def future_value(saved, monthly_input, annual_rate, months):
+    """Баланс через months месяцев (годовая ставка в процентах)"""
+    saved, monthly_input, rate, months = np.broadcast_arrays(
+        *(np.asarray(x, dtype='float64') for x in (saved, monthly_input, annual_rate, months))
+    )
+    r = rate / 12 / 100
+    growth = np.power(1 + r, months)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annuity = np.where(r > 0, (growth - 1) / np.where(r > 0, r, 1), months)
+    return saved * growth + monthly_input * annuity
+
+
+def months_to_goal(saved, goal, monthly_input, annual_rate, max_months=MAX_MONTHS):
+    """Месяцев до цели для любых сочетаний аргументов (broadcasting)
+
+    При ставке > 0 — целое число месяцев, как у помесячного цикла (не более
+    max_months). При нулевой ставке — remaining / monthly_input, как раньше
+    на странице прогноза.
+    """
+    saved, goal, monthly_input, rate = np.broadcast_arrays(
+        *(np.asarray(x, dtype='float64') for x in (saved, goal, monthly_input, annual_rate))
+    )
+    r = rate / 12 / 100
+    invest = r > 0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        simple = np.where(monthly_input > 0, (goal - saved) / monthly_input, 999)
+
+        safe_r = np.where(invest, r, 1.0)
+        numerator = goal * safe_r + monthly_input
+        denominator = saved * safe_r + monthly_input
+        exact = np.log(numerator / denominator) / np.log1p(safe_r)
+
+    reachable = invest & (denominator > 0) & (numerator > 0) & np.isfinite(exact)
+    months = np.where(reachable, np.ceil(np.where(reachable, exact, 0)), max_months)
+
+    # Поправка на округление: если цель достигнута на месяц раньше — берем его
+    earlier = np.maximum(months - 1, 0)
+    earlier_reached = reachable & (months > 0) & (
+        future_value(saved, monthly_input, rate, earlier) >= goal
+    )
+    months = np.where(earlier_reached, earlier, months)
+    months = np.where(saved >= goal, 0, np.minimum(months, max_months))
+
+    result = np.where(invest, months, simple)
+    return result if result.ndim else float(result)
+
+
+def sensitivity_grid(saved, goals, contributions, annual_rates, max_months=MAX_MONTHS):
+    """Сроки для сетки цели × взнос × ставка одним вызовом
+
+    saved и goals — массивы длины G, contributions — C, annual_rates — R.
+    Возвращает массив формы (G, C, R).
+    """
+    saved = np.asarray(saved, dtype='float64')[:, None, None]
+    goals = np.asarray(goals, dtype='float64')[:, None, None]
+    contributions = np.asarray(contributions, dtype='float64')[None, :, None]
+    annual_rates = np.asarray(annual_rates, dtype='float64')[None, None, :]
+    return months_to_goal(saved, goals, contributions, annual_rates, max_months)
+
+
+def sensitivity_table(grid_slice, contributions, annual_rates):
+    """Таблица одной цели: строки — взнос, колонки — ставка"""
+    return pd.DataFrame(
+        grid_slice,
+        index=pd.Index([f"{c:,.0f} ₽" for c in contributions], name='Взнос в месяц'),
+        columns=[f"{r:g}%" for r in annual_rates],
+    )
@@ -0,0 +1,185 @@
+# app/generator.py
+"""Векторный генератор синтетических транзакций
+
+Те же распределения, что и в untitled13.py (4–7 операций на пользователя
+в день, 85% расходов, равномерные суммы в диапазонах CATEGORIES_EXPENSE /
+CATEGORIES_INCOME), но строки создаются блоками массивов NumPy и сразу
+пишутся в CSV, JSON Lines, Parquet или таблицу transactions — весь набор
+в памяти не держится.
+
+Запуск: python -m app.generator --rows 100m --users 1000 --format csv --out big.csv
+"""
+import argparse
+import os
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from untitled13 import CATEGORIES_EXPENSE, CATEGORIES_INCOME
+
+CHUNK_ROWS = 1_000_000
+EXPENSE_SHARE = 0.85
+TX_PER_DAY = (4, 7)
+FORMATS = ('csv', 'jsonl', 'parquet', 'db')
+# --out по умолчанию: у каждого формата свой файл
+DEFAULT_OUT = {fmt: f'mock_transactions.{fmt}' for fmt in FORMATS}
+
+
+def _category_table(categories_expense, categories_income):
+    """Имена категорий и границы сумм одним массивом: сначала расходы, потом доходы"""
+    names = [name for name, _ in categories_expense] + [name for name, _ in categories_income]
+    bounds = np.array([rng for _, rng in categories_expense] + [rng for _, rng in categories_income],
+                      dtype='float64')
+    return names, bounds
+
+
+def iter_chunks(rows=None, days=365, users=1, seed=None, start_date=None,
+                categories_expense=CATEGORIES_EXPENSE, categories_income=CATEGORIES_INCOME,
+                chunk_rows=CHUNK_ROWS):
+    """Блоки DataFrame (amount, category, date, type, user_id) примерно по chunk_rows строк
+
+    Без rows генерирует ровно days дней; с rows — столько строк, добавляя
+    дни после days при необходимости.
+    """
+    rng = np.random.default_rng(seed)
+    start = np.datetime64(start_date or (date.today() - timedelta(days=days)), 'D')
+    names, bounds = _category_table(categories_expense, categories_income)
+    n_expense, n_income = len(categories_expense), len(categories_income)
+    category_dtype = pd.CategoricalDtype(list(dict.fromkeys(names)))
+    codes_by_position = category_dtype.categories.get_indexer(names)
+    type_dtype = pd.CategoricalDtype(['expense', 'income'])
+
+    # Блок: users_per_block пользователей × days_per_block дней
+    per_user_day = TX_PER_DAY[1] + 1
+    users_per_block = max(1, min(users, chunk_rows // per_user_day))
+    days_per_block = max(1, chunk_rows // (per_user_day * users_per_block))
+
+    produced = 0
+    day = 0
+    while (rows is None and day < days) or (rows is not None and produced < rows):
+        block_days = days_per_block if rows is not None else min(days_per_block, days - day)
+        for first_user in range(0, users, users_per_block):
+            block_users = min(users_per_block, users - first_user)
+
+            counts = rng.integers(TX_PER_DAY[0], TX_PER_DAY[1] + 1, size=(block_days, block_users)).ravel()
+            total = int(counts.sum())
+            day_index = np.repeat(np.repeat(np.arange(block_days), block_users), counts)
+            user_index = np.repeat(np.tile(np.arange(block_users), block_days), counts)
+
+            is_expense = rng.random(total) < EXPENSE_SHARE
+            position = np.where(
+                is_expense,
+                rng.integers(0, n_expense, size=total),
+                n_expense + rng.integers(0, n_income, size=total)
+            )
+            low, high = bounds[position, 0], bounds[position, 1]
+            amount = np.round(rng.uniform(low, high), 2)
+            amount = np.where(is_expense, -amount, amount)
+
+            chunk = pd.DataFrame({
+                'amount': amount,
+                'category': pd.Categorical.from_codes(codes_by_position[position], dtype=category_dtype),
+                'date': (start + day + day_index).astype('datetime64[ns]'),
+                'type': pd.Categorical.from_codes((~is_expense).astype('int8'), dtype=type_dtype),
+                'user_id': (first_user + 1 + user_index).astype('int32'),
+            })
+
+            if rows is not None and produced + len(chunk) > rows:
+                chunk = chunk.iloc[:rows - produced]
+            produced += len(chunk)
+            yield chunk
+            if rows is not None and produced >= rows:
+                return
+        day += block_days
+
+
+def _text_frame(chunk):
+    """Даты строками YYYY-MM-DD для текстовых форматов"""
+    out = chunk.copy()
+    out['date'] = np.datetime_as_string(chunk['date'].to_numpy(), unit='D')
+    return out
+
+
+def write(chunks, fmt, out=None, db=None):
+    """Потоковая запись блоков; возвращает статистику (строки, байты, скорость)"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат: {fmt}")
+    started = time.perf_counter()
+    rows = 0
+    parquet_writer = None
+
+    if fmt in ('csv', 'jsonl') and os.path.exists(out):
+        os.remove(out)
+
+    try:
+        for chunk in chunks:
+            if fmt == 'csv':
+                _text_frame(chunk).to_csv(out, mode='a', header=rows == 0, index=False, encoding='utf-8')
+            elif fmt == 'jsonl':
+                text = _text_frame(chunk).to_json(orient='records', lines=True, force_ascii=False)
+                with open(out, 'a', encoding='utf-8') as f:
+                    # Блоки склеиваются построчно: ровно один перевод строки в конце
+                    f.write(text if text.endswith('\n') else text + '\n')
+            elif fmt == 'parquet':
+                try:
+                    import pyarrow as pa
+                    import pyarrow.parquet as pq
+                except ImportError:
+                    raise ImportError("Для записи Parquet нужен пакет pyarrow") from None
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if parquet_writer is None:
+                    parquet_writer = pq.ParquetWriter(out, table.schema)
+                parquet_writer.write_table(table)
+            else:
+                db.bulk_insert_transactions(chunk, dedupe=False)
+            rows += len(chunk)
+    finally:
+        if parquet_writer is not None:
+            parquet_writer.close()
+
+    seconds = time.perf_counter() - started
+    return {
+        'rows': rows,
+        'bytes': os.path.getsize(out) if out and fmt != 'db' else None,
+        'seconds': seconds,
+        'rows_per_sec': rows / seconds if seconds > 0 else 0.0,
+    }
+
+
+def _parse_count(text):
+    """'10k' -> 10000, '100m' -> 100000000"""
+    text = text.strip().lower()
+    factor = {'k': 1_000, 'm': 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip('km')) * factor)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Генератор синтетических транзакций")
+    parser.add_argument('--rows', type=_parse_count, default=None, help="например 10k, 100m")
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--users', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--start-date', type=date.fromisoformat, default=None)
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--out', default=None,
+                        help="файл или путь к базе для db (по умолчанию mock_transactions.<формат>)")
+    parser.add_argument('--chunk-rows', type=_parse_count, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+    args.out = args.out or DEFAULT_OUT[args.format]
+
+    chunks = iter_chunks(rows=args.rows, days=args.days, users=args.users, seed=args.seed,
+                         start_date=args.start_date, chunk_rows=args.chunk_rows)
+    if args.format == 'db':
+        from database import Database
+        stats = write(chunks, 'db', db=Database(args.out))
+    else:
+        stats = write(chunks, args.format, out=args.out)
+
+    print(f"{stats['rows']:,} строк → {args.out} ({args.format}), "
+          f"{stats['seconds']:.1f} с, {stats['rows_per_sec']:,.0f} строк/с")
+
+
+if __name__ == "__main__":
+    main()
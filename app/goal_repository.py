@@ -0,0 +1,161 @@
+# app/goal_repository.py
+"""Цели пользователей в таблице goals
+
+GoalRepository читает все цели пользователя одним запросом и держит их в
+кэше процесса до первой записи этого пользователя. Изменение накоплений
+(current_amount) идет с оптимистичной блокировкой по колонке version:
+если цель успела измениться в другой сессии, обновление не применяется.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+
+import pandas as pd
+
+DEFAULT_CATEGORY = 'Другое'
+# Сколько пользователей держать в кэше целей
+CACHE_USERS = 1024
+
+_GOAL_COLUMNS = """
+    id, user_id, name, target_amount, current_amount, deadline, priority,
+    created_at, category, months, urgency, version
+"""
+
+
+def _goal_dict(row):
+    """Строка goals -> словарь цели в формате страниц приложения"""
+    (goal_id, user_id, name, target, saved, deadline, priority,
+     created_at, category, months, urgency, version) = row
+    return {
+        'id': goal_id,
+        'user_id': user_id,
+        'name': name,
+        'amount': target,
+        'saved': saved or 0,
+        'deadline': deadline,
+        'priority': priority,
+        'created': (created_at or '')[:10],
+        'category': category or DEFAULT_CATEGORY,
+        'months': months or 12,
+        'urgency': urgency,
+        'version': version,
+    }
+
+
+class GoalRepository:
+    """Чтение и запись целей через Database с кэшем по пользователю"""
+
+    def __init__(self, db, cache_users=CACHE_USERS):
+        self.db = db
+        self.cache_users = cache_users
+        self._cache = OrderedDict()
+        self._user_ids = {}
+        self._lock = threading.Lock()
+
+    def user_id(self, username, full_name=None, email=None):
+        """id в таблице users для логина приложения (создается при первом обращении)"""
+        with self._lock:
+            if username in self._user_ids:
+                return self._user_ids[username]
+        # email уникален в users; логин без email хранится как username@local
+        email = email or (username if '@' in username else f'{username}@local')
+        with self.db.get_connection() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO users (email, full_name) VALUES (?, ?)",
+                (email, full_name or username)
+            )
+            conn.commit()
+            user_id = conn.execute("SELECT id FROM users WHERE email = ?", (email,)).fetchone()[0]
+        with self._lock:
+            self._user_ids[username] = user_id
+        return user_id
+
+    def _invalidate(self, user_id):
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+    def for_users(self, user_ids):
+        """Цели нескольких пользователей одним запросом: user_id -> список"""
+        user_ids = list(dict.fromkeys(user_ids))
+        result = {user_id: [] for user_id in user_ids}
+        if not user_ids:
+            return result
+        rows = self.db.execute_query(
+            f"SELECT {_GOAL_COLUMNS} FROM goals WHERE user_id IN ({', '.join('?' * len(user_ids))}) "
+            "ORDER BY user_id, deadline, id",
+            user_ids
+        )
+        for row in rows:
+            result[row[1]].append(_goal_dict(row))
+        return result
+
+    def for_user(self, user_id):
+        """Цели пользователя: из кэша или одним запросом"""
+        with self._lock:
+            if user_id in self._cache:
+                self._cache.move_to_end(user_id)
+                return self._cache[user_id]
+        goals = self.for_users([user_id])[user_id]
+        with self._lock:
+            self._cache[user_id] = goals
+            while len(self._cache) > self.cache_users:
+                self._cache.popitem(last=False)
+        return goals
+
+    def get(self, user_id, goal_id):
+        for goal in self.for_user(user_id):
+            if goal['id'] == goal_id:
+                return goal
+        return None
+
+    def create(self, user_id, name, amount, category=DEFAULT_CATEGORY, months=None,
+               saved=0, deadline=None, priority='medium', urgency=None):
+        """Новая цель; срок — deadline или через months месяцев. Возвращает id"""
+        if deadline is None and months:
+            deadline = (pd.Timestamp(date.today()) + pd.DateOffset(months=int(months))).date()
+        with self.db.get_connection() as conn:
+            cursor = conn.execute(
+                """
+                INSERT INTO goals (user_id, name, target_amount, current_amount, deadline,
+                                   priority, category, months, urgency, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (user_id, name, float(amount), float(saved), str(deadline) if deadline else None,
+                 priority, category, int(months) if months else None, urgency,
+                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            conn.commit()
+        self._invalidate(user_id)
+        return cursor.lastrowid
+
+    def update_saved(self, user_id, goal_id, saved, expected_version):
+        """Записать накопленную сумму, если цель не менялась с expected_version
+
+        Возвращает True при успехе и False при конфликте (цель изменена в
+        другой сессии или удалена) — тогда кэш сбрасывается и страница
+        перечитывает актуальные данные.
+        """
+        with self.db.get_connection() as conn:
+            cursor = conn.execute(
+                "UPDATE goals SET current_amount = ?, version = version + 1 "
+                "WHERE id = ? AND user_id = ? AND version = ?",
+                (float(saved), goal_id, user_id, expected_version)
+            )
+            conn.commit()
+        self._invalidate(user_id)
+        return cursor.rowcount == 1
+
+    def add_saved(self, user_id, goal_id, delta, expected_version):
+        """Прибавить delta к накоплениям цели с той же проверкой версии"""
+        goal = self.get(user_id, goal_id)
+        if goal is None or goal['version'] != expected_version:
+            self._invalidate(user_id)
+            return False
+        return self.update_saved(user_id, goal_id, goal['saved'] + delta, expected_version)
+
+    def delete(self, user_id, goal_id):
+        with self.db.get_connection() as conn:
+            cursor = conn.execute("DELETE FROM goals WHERE id = ? AND user_id = ?", (goal_id, user_id))
+            conn.commit()
+        self._invalidate(user_id)
+        return cursor.rowcount == 1
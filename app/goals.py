@@ -1,9 +1,10 @@
+import math
 import streamlit as st
 from datetime import datetime, timedelta
 import pandas as pd
 
-def show_goals_page():
-    """Страница управления целями"""
+def show_goals_page(repository, user_id):
+    """Страница управления целями (хранятся в таблице goals через GoalRepository)"""
     
     st.header("🎯 Финансовые цели")
     
@@ -15,13 +16,13 @@ def show_goals_page():
     
     # Если нажали кнопку создания - показываем форму
     if st.session_state.get('show_new_goal_form', False):
-        show_new_goal_form()
+        show_new_goal_form(repository, user_id)
         st.markdown("---")
     
     # Список существующих целей
-    show_goals_list()
+    show_goals_list(repository, user_id)
 
-def show_new_goal_form():
+def show_new_goal_form(repository, user_id):
     """Форма создания новой цели"""
     st.subheader("📝 Создание новой цели")
     
@@ -91,31 +92,19 @@ def show_new_goal_form():
         
         if submit:
             if goal_name and goal_amount:
-                # Создаем новую цель
-                new_goal = {
-                    "id": len(st.session_state.goals) + 1,
-                    "name": goal_name,
-                    "amount": goal_amount,
-                    "saved": current_saved,
-                    "priority": priority,
-                    "urgency": urgency,
-                    "target_date": target_date.strftime("%Y-%m-%d"),
-                    "category": category,
-                    "monthly_saving": monthly_saving,
-                    "created": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                    "active": True
-                }
-                
-                # Расчет времени до цели
+                # Срок в месяцах при планируемом ежемесячном накоплении
                 remaining = goal_amount - current_saved
-                if monthly_saving > 0:
-                    months_needed = remaining / monthly_saving
-                    new_goal["estimated_months"] = months_needed
-                    new_goal["estimated_date"] = (
-                        datetime.now() + timedelta(days=months_needed * 30)
-                    ).strftime("%Y-%m-%d")
+                months_needed = max(math.ceil(remaining / monthly_saving), 1)
                 
-                st.session_state.goals.append(new_goal)
+                repository.create(
+                    user_id, goal_name, goal_amount,
+                    category=category,
+                    months=months_needed,
+                    saved=current_saved,
+                    deadline=target_date,
+                    priority=priority,
+                    urgency=urgency
+                )
                 st.session_state.show_new_goal_form = False
                 st.success(f"Цель '{goal_name}' успешно создана!")
                 st.rerun()
@@ -126,10 +115,11 @@ def show_new_goal_form():
             st.session_state.show_new_goal_form = False
             st.rerun()
 
-def show_goals_list():
+def show_goals_list(repository, user_id):
     """Отображение списка целей"""
     
-    if not st.session_state.goals:
+    goals = repository.for_user(user_id)
+    if not goals:
         st.info("🎯 У вас пока нет финансовых целей. Создайте первую цель!")
         return
     
@@ -151,7 +141,7 @@ def show_goals_list():
         search_term = st.text_input("Поиск по названию", "")
     
     # Фильтрация целей
-    filtered_goals = st.session_state.goals.copy()
+    filtered_goals = list(goals)
     
     if show_active:
         filtered_goals = [g for g in filtered_goals if g.get('active', True)]
@@ -177,10 +167,10 @@ def show_goals_list():
     # Отображение целей
     for goal in filtered_goals:
         with st.container():
-            show_single_goal(goal)
+            show_single_goal(goal, repository, user_id)
             st.markdown("---")
 
-def show_single_goal(goal):
+def show_single_goal(goal, repository, user_id):
     """Отображение одной цели"""
     
     # Рассчитываем прогресс
@@ -229,12 +219,12 @@ def show_single_goal(goal):
         # Метрики
         st.metric("💰 Осталось накопить", f"{remaining:,} ₽")
         
-        if goal.get('estimated_months'):
-            st.metric("📅 Ориентировочно", f"{goal['estimated_months']:.1f} мес")
+        if goal.get('months'):
+            st.metric("📅 Ориентировочно", f"{goal['months']} мес")
         
         # Дата цели
-        if goal.get('target_date'):
-            st.caption(f"📅 Цель до: {goal['target_date']}")
+        if goal.get('deadline'):
+            st.caption(f"📅 Цель до: {goal['deadline']}")
     
     with col3:
         # Кнопки действий
@@ -252,5 +242,5 @@ def show_single_goal(goal):
         
         if st.button("🗑️", key=f"delete_{goal['id']}", help="Удалить"):
             if st.checkbox(f"Удалить цель '{goal['name']}'?", key=f"confirm_delete_{goal['id']}"):
-                st.session_state.goals = [g for g in st.session_state.goals if g['id'] != goal['id']]
+                repository.delete(user_id, goal['id'])
                 st.rerun()
\ No newline at end of file
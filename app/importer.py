@@ -0,0 +1,326 @@
+# app/importer.py
+"""Потоковый импорт банковских выгрузок (CSV, JSON, JSON Lines) в transactions
+
+Файл читается блоками (loader.iter_transaction_chunks), каждый блок
+проверяется и нормализуется: заголовки, сумма, дата в одном из
+DATE_FORMATS, тип и знак суммы (расход отрицательный, доход
+положительный), категория — к категориям приложения. Поток чтения кладет
+готовые блоки в очередь на QUEUE_CHUNKS блоков; если запись в SQLite
+отстает, чтение ждет, поэтому в памяти не больше (QUEUE_CHUNKS + 2) блоков
+при любом размере файла. Отбракованные строки с причиной пишутся в
+отдельный CSV.
+
+Запуск: python -m app.importer выписка.csv --user-id 1 --sep ";"
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from app.loader import iter_transaction_chunks
+from untitled13 import CATEGORIES_EXPENSE, CATEGORIES_INCOME
+
+CHUNK_ROWS = 20_000
+# Сколько готовых блоков может ждать записи
+QUEUE_CHUNKS = 4
+# Категория для строк, которых нет в справочнике
+OTHER_CATEGORY = 'другое'
+
+DATE_FORMATS = ('ISO8601', '%d.%m.%Y', '%d.%m.%Y %H:%M:%S', '%d.%m.%Y %H:%M', '%d/%m/%Y', '%d.%m.%y')
+
+# Заголовки выгрузок -> колонки таблицы transactions
+COLUMN_ALIASES = {
+    'сумма': 'amount', 'сумма операции': 'amount', 'sum': 'amount',
+    'дата': 'date', 'дата операции': 'date', 'дата платежа': 'date',
+    'категория': 'category',
+    'тип': 'type', 'тип операции': 'type',
+    'описание': 'description', 'назначение платежа': 'description', 'комментарий': 'description',
+}
+
+TYPE_ALIASES = {
+    'income': 'income', 'доход': 'income', 'поступление': 'income', 'пополнение': 'income',
+    'credit': 'income', 'зачисление': 'income',
+    'expense': 'expense', 'расход': 'expense', 'трата': 'expense', 'списание': 'expense',
+    'debit': 'expense', 'покупка': 'expense', 'оплата': 'expense',
+}
+
+# Категории банков -> категории приложения (сами категории приложения отображаются на себя)
+CATEGORY_ALIASES = {
+    **{name: name for name, _ in CATEGORIES_EXPENSE + CATEGORIES_INCOME},
+    OTHER_CATEGORY: OTHER_CATEGORY,
+    'продукты': 'супермаркет', 'супермаркеты': 'супермаркет', 'магазины': 'магазин',
+    'рестораны': 'ресторан', 'кафе и рестораны': 'ресторан', 'фастфуд': 'кафе',
+    'такси': 'транспорт', 'местный транспорт': 'транспорт', 'топливо': 'транспорт',
+    'аптеки': 'аптека', 'здоровье': 'аптека', 'одежда и обувь': 'одежда',
+    'кино': 'развлечения', 'развлечения и хобби': 'развлечения',
+    'связь': 'услуги', 'жкх': 'услуги', 'коммунальные платежи': 'услуги',
+    'заработная плата': 'зарплата', 'cashback': 'кэшбэк', 'кешбэк': 'кэшбэк',
+}
+
+
+def _text(series):
+    """Строки в нижнем регистре без крайних пробелов (пропуски -> '')"""
+    return series.astype(object).where(series.notna(), '').astype(str).str.strip().str.lower()
+
+
+def _parse_amounts(series):
+    """Суммы из чисел или строк вида '-1 234,56'"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype('float64')
+    cleaned = (series.astype(object).where(series.notna(), '').astype(str)
+               .str.replace(r'[\s ₽]', '', regex=True)
+               .str.replace(',', '.', regex=False))
+    return pd.to_numeric(cleaned, errors='coerce')
+
+
+def _parse_dates(series):
+    """Даты в любом из DATE_FORMATS; нераспознанные -> NaT"""
+    values = series.astype(object).where(series.notna(), '').astype(str).str.strip()
+    result = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+    for fmt in DATE_FORMATS:
+        missing = result.isna() & (values != '')
+        if not missing.any():
+            break
+        result[missing] = pd.to_datetime(values[missing], format=fmt, errors='coerce')
+    return result
+
+
+def normalize_chunk(chunk, category_map=CATEGORY_ALIASES, unknown_category=OTHER_CATEGORY, stats=None):
+    """Проверка и приведение блока выгрузки
+
+    Возвращает (принятые строки amount/category/date/type/description,
+    отбракованные исходные строки с колонкой reason). unknown_category=None —
+    неизвестная категория отбраковывает строку. stats пополняется
+    счетчиками исправлений.
+    """
+    stats = stats if stats is not None else Counter()
+    chunk = chunk.rename(columns=lambda name: COLUMN_ALIASES.get(str(name).strip().lower(), str(name).strip()))
+    reason = pd.Series('', index=chunk.index, dtype=object)
+
+    def reject(mask, why):
+        mask = mask & (reason == '')
+        reason[mask] = why
+
+    for column in ('amount', 'date'):
+        if column not in chunk.columns:
+            empty = pd.DataFrame(columns=['amount', 'category', 'date', 'type', 'description'])
+            return empty, chunk.assign(reason=f'нет колонки {column}')
+
+    amount = _parse_amounts(chunk['amount'])
+    reject(amount.isna() | ~np.isfinite(amount.fillna(0)), 'сумма')
+    reject(amount == 0, 'нулевая сумма')
+
+    date = _parse_dates(chunk['date'])
+    reject(date.isna(), 'дата')
+
+    # Тип: из колонки, а если ее нет или пусто — по знаку суммы
+    raw_type = _text(chunk['type']) if 'type' in chunk.columns else pd.Series('', index=chunk.index)
+    tx_type = raw_type.map(TYPE_ALIASES)
+    inferred = raw_type == ''
+    tx_type[inferred] = np.where(amount[inferred] > 0, 'income', 'expense')
+    reject(tx_type.isna(), 'тип')
+
+    # Знак суммы по типу: выгрузки часто дают модуль суммы
+    sign = np.where(tx_type == 'income', 1.0, -1.0)
+    flipped = (np.sign(amount) != sign) & ~inferred & (reason == '')
+    stats['sign_fixed'] += int(flipped.sum())
+    amount = amount.abs() * sign
+
+    raw_category = _text(chunk['category']) if 'category' in chunk.columns else pd.Series('', index=chunk.index)
+    category = raw_category.map(category_map)
+    unknown = category.isna() & (reason == '')
+    if unknown_category is None:
+        reject(unknown, 'категория')
+    else:
+        category[unknown] = unknown_category
+    stats['unknown_category'] += int(unknown.sum())
+
+    if 'description' in chunk.columns:
+        description = chunk['description'].astype(object).where(chunk['description'].notna(), '')
+    else:
+        description = pd.Series('', index=chunk.index, dtype=object)
+
+    ok = (reason == '').to_numpy()
+    accepted = pd.DataFrame({
+        'amount': amount[ok].round(2),
+        'category': category[ok],
+        'date': date[ok],
+        'type': tx_type[ok],
+        'description': description[ok],
+    })
+    return accepted, chunk[~ok].assign(reason=reason[~ok])
+
+
+class _RejectWriter:
+    """CSV отбракованных строк; файл создается при первой такой строке"""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._columns = None
+
+    def write(self, rejected):
+        if rejected.empty or self.path is None:
+            return
+        if self._columns is None:
+            self._columns = list(rejected.columns)
+            rejected.to_csv(self.path, index=False, encoding='utf-8')
+        else:
+            rejected.reindex(columns=self._columns).to_csv(self.path, mode='a', header=False,
+                                                            index=False, encoding='utf-8')
+        self.rows += len(rejected)
+
+
+def import_file(db, path, user_id=1, fmt=None, sep=',', chunk_rows=CHUNK_ROWS, reject_path=None,
+                category_map=CATEGORY_ALIASES, unknown_category=OTHER_CATEGORY,
+                queue_chunks=QUEUE_CHUNKS, dedupe=False, progress=None):
+    """Импорт файла в transactions; возвращает статистику со скоростью
+
+    reject_path по умолчанию — <файл>.rejects.csv рядом с исходным.
+    dedupe=True пропускает строки, уже имеющиеся по естественному ключу
+    (для повторного импорта той же выписки); одинаковые покупки в самой
+    выписке при этом тоже схлопываются.
+    progress(stats) вызывается после чтения каждого блока.
+    """
+    started = time.perf_counter()
+    reject_path = reject_path or f'{os.path.splitext(path)[0]}.rejects.csv'
+    read_stats = {}
+    counters = Counter()
+    stats = {'path': path, 'rows': 0, 'accepted': 0, 'rejected': 0, 'reject_path': None,
+             'reasons': {}, 'chunks': 0, 'wait_seconds': 0.0, 'max_queue': 0}
+    rejects = _RejectWriter(reject_path)
+    chunks = queue.Queue(maxsize=queue_chunks)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        """Положить в очередь, ожидая писателя (back-pressure), пока импорт не прерван"""
+        waited = time.perf_counter()
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        stats['wait_seconds'] += time.perf_counter() - waited
+        stats['max_queue'] = max(stats['max_queue'], chunks.qsize())
+
+    def read():
+        offset = 0
+        try:
+            for raw in iter_transaction_chunks(path, fmt, chunk_rows, read_stats, typed=False, sep=sep):
+                if stop.is_set():
+                    return
+                # Номер строки данных в файле (с 1) для файла отказов
+                raw.index = pd.RangeIndex(offset + 1, offset + 1 + len(raw), name='row')
+                offset += len(raw)
+                accepted, rejected = normalize_chunk(raw, category_map, unknown_category, counters)
+                rejects.write(rejected.reset_index())
+                stats['rows'] += len(raw)
+                stats['accepted'] += len(accepted)
+                stats['rejected'] += len(rejected)
+                stats['chunks'] += 1
+                counters.update(rejected['reason'])
+                if progress is not None:
+                    progress(dict(stats, bytes=read_stats.get('bytes', 0),
+                                  seconds=time.perf_counter() - started))
+                put(accepted)
+        except Exception as e:
+            put(e)
+        else:
+            put(done)
+
+    def drain():
+        while True:
+            item = chunks.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    reader = threading.Thread(target=read, name='importer-reader', daemon=True)
+    reader.start()
+    try:
+        insert = db.bulk_insert_transactions(drain(), user_id=user_id, batch_size=chunk_rows, dedupe=dedupe)
+    finally:
+        stop.set()
+        reader.join()
+
+    seconds = time.perf_counter() - started
+    stats.update({
+        'inserted': insert['inserted'],
+        'duplicates': insert['duplicates'],
+        'sign_fixed': counters.pop('sign_fixed', 0),
+        'unknown_category': counters.pop('unknown_category', 0),
+        'reasons': dict(counters),
+        'reject_path': reject_path if rejects.rows else None,
+        'format': read_stats.get('format'),
+        'bytes': read_stats.get('bytes', 0),
+        'seconds': seconds,
+        'rows_per_sec': stats['rows'] / seconds if seconds > 0 else 0.0,
+        'mb_per_sec': read_stats.get('bytes', 0) / 2**20 / seconds if seconds > 0 else 0.0,
+    })
+    return stats
+
+
+def main(argv=None):
+    from database import Database
+
+    parser = argparse.ArgumentParser(description="Импорт банковской выгрузки в таблицу transactions")
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--db', default='financial_assistant.db')
+    parser.add_argument('--user-id', type=int, default=1)
+    parser.add_argument('--format', choices=('csv', 'json', 'jsonl'), default=None)
+    parser.add_argument('--sep', default=',', help="разделитель CSV")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--rejects', default=None, help="файл отбракованных строк")
+    parser.add_argument('--categories', default=None, help="JSON {категория банка: категория приложения}")
+    parser.add_argument('--strict-categories', action='store_true', help="неизвестные категории — в отказы")
+    parser.add_argument('--dedupe', action='store_true',
+                        help="пропускать строки, уже имеющиеся в базе (повторный импорт)")
+    parser.add_argument('--categorize', action='store_true', help="после импорта применить правила категорий")
+    args = parser.parse_args(argv)
+
+    category_map = dict(CATEGORY_ALIASES)
+    if args.categories:
+        with open(args.categories, encoding='utf-8') as f:
+            category_map.update({key.strip().lower(): value for key, value in json.load(f).items()})
+
+    def progress(stats):
+        print(f"\r  {stats['rows']:,} строк, {stats['bytes'] / 2**20:,.1f} МБ, "
+              f"{stats['rows'] / max(stats['seconds'], 1e-9):,.0f} строк/с", end='', flush=True)
+
+    db = Database(args.db)
+    for path in args.paths:
+        print(path)
+        stats = import_file(
+            db, path, user_id=args.user_id, fmt=args.format, sep=args.sep, chunk_rows=args.chunk_rows,
+            reject_path=args.rejects, category_map=category_map,
+            unknown_category=None if args.strict_categories else OTHER_CATEGORY,
+            dedupe=args.dedupe, progress=progress,
+        )
+        print(f"\r  {stats['rows']:,} строк за {stats['seconds']:.2f} с: {stats['rows_per_sec']:,.0f} строк/с, "
+              f"{stats['mb_per_sec']:,.1f} МБ/с")
+        print(f"  добавлено {stats['inserted']:,}, дубликатов {stats['duplicates']:,}, "
+              f"отбраковано {stats['rejected']:,} {stats['reasons'] or ''}")
+        print(f"  исправлен знак: {stats['sign_fixed']:,}, неизвестных категорий: {stats['unknown_category']:,}, "
+              f"ожидание записи: {stats['wait_seconds']:.2f} с")
+        if stats['reject_path']:
+            print(f"  отказы: {stats['reject_path']}")
+
+    if args.categorize:
+        from app.categorizer import RuleCategorizer
+
+        stats = RuleCategorizer(db).reclassify(args.user_id)
+        print(f"Правила категорий: изменено {stats['updated']:,} строк за {stats['seconds']:.2f} с")
+
+
+if __name__ == "__main__":
+    main()
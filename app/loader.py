@@ -0,0 +1,204 @@
+# app/loader.py
+"""Потоковая загрузка транзакций из JSON, JSON Lines и CSV"""
+import codecs
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Сколько записей собираем в один типизированный блок
+CHUNK_ROWS = 50_000
+# Размер блока чтения файла
+READ_BLOCK = 1 << 20
+
+CATEGORICAL_COLUMNS = ('category', 'type')
+DEFAULT_COLUMNS = ['amount', 'category', 'date', 'type', 'description']
+
+_decoder = json.JSONDecoder()
+
+
+def detect_format(path):
+    """Определение формата файла по расширению и первому символу"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return 'csv'
+    if ext in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+
+    # .json может оказаться как массивом, так и JSON Lines
+    with open(path, 'rb') as f:
+        head = f.read(4096).lstrip(codecs.BOM_UTF8).lstrip()
+    return 'jsonl' if head.startswith(b'{') else 'json'
+
+
+def _iter_json_array(f, stats):
+    """Разбор JSON-массива по одному объекту без загрузки файла целиком"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    buf = ''
+    pos = 0
+    started = False
+    eof = False
+
+    while True:
+        # Пропускаем пробелы, запятые и открывающую скобку
+        while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ','
+                                  or (buf[pos] == '[' and not started)):
+            if buf[pos] == '[':
+                started = True
+            pos += 1
+
+        if pos < len(buf):
+            if buf[pos] == ']':
+                return
+            if not started:
+                raise ValueError("Ожидался JSON-массив транзакций")
+            try:
+                obj, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Объект разрезан границей блока — дочитываем
+                if eof:
+                    raise
+            else:
+                pos = end
+                yield obj
+                continue
+        elif eof:
+            if started:
+                raise ValueError("Неожиданный конец JSON-массива")
+            return
+
+        block = f.read(READ_BLOCK)
+        stats['bytes'] += len(block)
+        eof = not block
+        buf = buf[pos:] + decoder.decode(block, final=eof)
+        pos = 0
+
+
+def _iter_json_lines(f, stats):
+    """Разбор JSON Lines построчно"""
+    for line in f:
+        stats['bytes'] += len(line)
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _iter_record_chunks(records, chunk_rows):
+    """Группировка потока записей в списки по chunk_rows"""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_rows:
+            yield pd.DataFrame(chunk)
+            chunk = []
+    if chunk:
+        yield pd.DataFrame(chunk)
+
+
+def _typed_chunk(chunk):
+    """Приведение блока к типам, которые использует дашборд"""
+    if 'amount' in chunk.columns:
+        chunk['amount'] = pd.to_numeric(chunk['amount']).astype('float64')
+    if 'date' in chunk.columns:
+        chunk['date'] = pd.to_datetime(chunk['date'])
+    for col in CATEGORICAL_COLUMNS:
+        if col in chunk.columns:
+            chunk[col] = chunk[col].astype('category')
+    return chunk
+
+
+def iter_transaction_chunks(path, fmt=None, chunk_rows=CHUNK_ROWS, stats=None, typed=True, sep=','):
+    """Потоковое чтение файла транзакций типизированными блоками
+
+    stats (dict) заполняется по ходу чтения: формат, байты, строки, блоки.
+    typed=False отдает блоки как есть (CSV — строками) для проверки в импорте.
+    """
+    fmt = fmt or detect_format(path)
+    if stats is None:
+        stats = {}
+    stats.update({'path': path, 'format': fmt, 'bytes': 0, 'rows': 0, 'chunks': 0})
+
+    with open(path, 'rb') as f:
+        if fmt == 'csv':
+            reader = pd.read_csv(f, chunksize=chunk_rows, encoding='utf-8-sig', sep=sep,
+                                 dtype=None if typed else str, keep_default_na=typed)
+        elif fmt == 'jsonl':
+            reader = _iter_record_chunks(_iter_json_lines(f, stats), chunk_rows)
+        elif fmt == 'json':
+            reader = _iter_record_chunks(_iter_json_array(f, stats), chunk_rows)
+        else:
+            raise ValueError(f"Неизвестный формат: {fmt}")
+
+        for chunk in reader:
+            if fmt == 'csv':
+                stats['bytes'] = f.tell()
+            stats['rows'] += len(chunk)
+            stats['chunks'] += 1
+            yield _typed_chunk(chunk) if typed else chunk
+
+        if fmt == 'csv':
+            stats['bytes'] = f.tell()
+
+
+def _empty_column(dtype_like, length):
+    """Пустая колонка нужной длины для блока, где колонки не было"""
+    if isinstance(dtype_like, pd.CategoricalDtype):
+        return pd.Categorical([None] * length)
+    return pd.Series([np.nan] * length, dtype=dtype_like if dtype_like.kind in 'fM' else object)
+
+
+def concat_chunks(chunks):
+    """Склейка блоков с объединением категорий вместо отката к object"""
+    if not chunks:
+        return pd.DataFrame({
+            'amount': pd.Series(dtype='float64'),
+            'category': pd.Categorical([]),
+            'date': pd.Series(dtype='datetime64[ns]'),
+            'type': pd.Categorical([]),
+            'description': pd.Series(dtype=object),
+        })
+
+    columns = list(dict.fromkeys(col for chunk in chunks for col in chunk.columns))
+    data = {}
+    for col in columns:
+        dtype_like = next(chunk[col].dtype for chunk in chunks if col in chunk.columns)
+        parts = [
+            chunk[col].array if col in chunk.columns else _empty_column(dtype_like, len(chunk))
+            for chunk in chunks
+        ]
+        if isinstance(dtype_like, pd.CategoricalDtype):
+            data[col] = union_categoricals(
+                [pd.Categorical(p) for p in parts], sort_categories=True
+            )
+        else:
+            data[col] = pd.concat([pd.Series(p) for p in parts], ignore_index=True)
+    return pd.DataFrame(data)
+
+
+def load_transactions(path, fmt=None, chunk_rows=CHUNK_ROWS):
+    """Загрузка файла транзакций в DataFrame дашборда
+
+    Возвращает (df, stats), где stats — сколько байт и строк обработано.
+    """
+    started = time.perf_counter()
+    stats = {}
+    df = concat_chunks(list(iter_transaction_chunks(path, fmt, chunk_rows, stats)))
+
+    # Добавляем необходимые колонки если их нет
+    if 'description' not in df.columns:
+        df['description'] = ''
+
+    stats['seconds'] = time.perf_counter() - started
+    return df, stats
+
+
+if __name__ == "__main__":
+    for source in sys.argv[1:] or ['data/csvjson.json']:
+        frame, info = load_transactions(source)
+        print(f"{info['path']}: {info['format']}, {info['bytes']:,} байт, "
+              f"{info['rows']:,} строк, {info['chunks']} блоков, {info['seconds']:.3f} с")
+        print(frame.dtypes.to_string())
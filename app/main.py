@@ -1,10 +1,35 @@
+import os
+import time
+import uuid
 import streamlit as st
 import pandas as pd
 import numpy as np
-import json
-import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 
+# Запуск из корня проекта: python -m streamlit run app/main.py
+# (через -m корень попадает в путь Python, и импортируются пакет app и database)
+from app import profiling
+from app.aggregates import financial_summary, goals_progress
+from app.anomalies import detect, duplicates_frame, outliers_frame
+from app.categorizer import UNCATEGORIZED, RuleCategorizer
+from app.charts import build_charts
+from app.forecast import current_rates, months_to_goal, sensitivity_grid, sensitivity_table
+from app.goal_repository import GoalRepository
+from app.formatting import display_columns, format_dates, format_money
+from app.refresher import DataRefresher, DatabaseSource, FileSource
+from app.simulation import monthly_history, simulate_goals
+from app.store import DatasetStore, SessionRegistry
+from app.transactions import (
+    ALL_CATEGORIES, PAGE_SIZE, PAGE_SIZES, categories, date_bounds, ensure_loaded,
+    fetch_page, period_totals, top_expenses,
+)
+from database import Database
+
+DATA_PATH = 'data/csvjson.json'
+DB_PATH = 'financial_assistant.db'
+# Источник данных страниц: 'file' (DATA_PATH) или 'db' (таблица transactions)
+DATA_SOURCE = os.environ.get('DATA_SOURCE', 'file')
+
 # Настройка страницы
 st.set_page_config(
     page_title="💰 Умный финансовый помощник",
@@ -13,81 +38,89 @@ st.set_page_config(
 )
 
 # Глобальные функции для загрузки данных
-@st.cache_data
+@st.cache_resource
+def get_store():
+    """Общие для всех сессий наборы данных (только чтение)"""
+    return DatasetStore()
+
+@st.cache_resource
+def get_sessions():
+    """Реестр легких состояний сессий с выселением простаивающих"""
+    return SessionRegistry()
+
+def current_session():
+    """Состояние текущей сессии: в st.session_state хранится только его id"""
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    return get_sessions().touch(st.session_state.session_id)
+
+# cache_resource: один общий (mmap) DataFrame на процесс без копирования на каждый вызов
+@st.cache_resource
+def get_refresher():
+    """Фоновый поток: следит за источником и подменяет снимок (компактные транзакции + куб) готовым"""
+    if DATA_SOURCE == 'db':
+        source = DatabaseSource(get_database())
+    else:
+        # Колоночный кэш на диске; один экземпляр набора на версию для всех сессий
+        source = FileSource(DATA_PATH, get_store())
+    return DataRefresher(source, on_swap=lambda old, new: get_store().discard(old.version)).start()
+
 def load_transaction_data():
-    """Загрузка данных из csvjson.json"""
-    try:
-        with open('data/csvjson.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        df = pd.DataFrame(data)
-        df['date'] = pd.to_datetime(df['date'])
-        
-        # Добавляем необходимые колонки если их нет
-        if 'description' not in df.columns:
-            df['description'] = ''
-        
-        return df
-    except Exception as e:
-        st.error(f"Ошибка загрузки данных: {e}")
-        return pd.DataFrame()
+    """Текущий снимок данных; при обновлении источника — прежний, пока новый не готов"""
+    with profiling.span('load_transaction_data'):
+        return get_refresher().snapshot()
+
+@profiling.cache_calls
+@st.cache_resource
+@profiling.cache_misses
+def get_database():
+    """Общий на процесс Database с пулом соединений; демо-данные загружаются один раз"""
+    db = Database(DB_PATH)
+    ensure_loaded(db, DATA_PATH)
+    return db
+
+@st.cache_resource
+def get_goal_repository():
+    """Цели пользователей в таблице goals с кэшем до первой записи"""
+    return GoalRepository(get_database())
+
+def current_user_id():
+    """id текущего пользователя в таблице users"""
+    user = st.session_state.user
+    return get_goal_repository().user_id(user['username'], user.get('name'), user.get('email'))
+
+def current_goals():
+    """Цели текущего пользователя (один запрос, дальше — из кэша репозитория)"""
+    return get_goal_repository().for_user(current_user_id())
 
-@st.cache_data
-def get_financial_summary(df):
+@profiling.cache_calls
+@st.cache_resource(max_entries=4)
+@profiling.cache_misses
+def get_charts(version, _aggregates):
+    """Фигуры plotly, одни на версию набора данных (вместе с кубом агрегатов)"""
+    return build_charts(_aggregates)
+
+@profiling.cache_calls
+@st.cache_resource(max_entries=4)
+@profiling.cache_misses
+def get_anomalies(version, _transactions):
+    """Дубликаты и выбросы, один поиск на версию набора данных"""
+    with profiling.span('anomalies'):
+        return detect(_transactions)
+
+def get_financial_summary(aggregates):
     """Расчет финансовой сводки"""
-    if df.empty:
-        return {
-            'total_income': 0,
-            'total_expense': 0,
-            'balance': 0,
-            'transaction_count': 0,
-            'expense_by_category': pd.Series(dtype=float),
-            'income_by_category': pd.Series(dtype=float)
-        }
-    
-    income_df = df[df['type'] == 'income']
-    expense_df = df[df['type'] == 'expense']
-    
-    return {
-        'total_income': income_df['amount'].sum(),
-        'total_expense': abs(expense_df['amount'].sum()),
-        'balance': income_df['amount'].sum() - abs(expense_df['amount'].sum()),
-        'transaction_count': len(df),
-        'expense_by_category': expense_df.groupby('category')['amount'].sum().abs(),
-        'income_by_category': income_df.groupby('category')['amount'].sum()
-    }
+    with profiling.span('financial_summary'):
+        return financial_summary(aggregates)
 
-@st.cache_data
-def get_goals_progress(df):
+def get_goals_progress(aggregates):
     """Расчет прогресса по целям на основе расходов"""
-    if df.empty:
-        return []
-    
-    expense_by_category = df[df['type'] == 'expense'].groupby('category')['amount'].sum().abs()
-    
-    # Создаем цели на основе категорий расходов
-    goals = []
-    for category, amount in expense_by_category.items():
-        # Цель - сократить расходы по категории на 20%
-        target_amount = amount * 0.8  # Сократить на 20%
-        saved = amount - target_amount  # Уже "сэкономили" если тратим меньше
-        
-        goals.append({
-            'name': f'Сократить {category}',
-            'category': category,
-            'current': amount,
-            'target': target_amount,
-            'saved': max(0, saved),
-            'priority': 'Высокий' if amount > expense_by_category.median() else 'Средний'
-        })
-    
-    return goals
+    with profiling.span('goals_progress'):
+        return goals_progress(aggregates)
 
 # Инициализация состояния
 if 'user' not in st.session_state:
     st.session_state.user = None
-if 'custom_goals' not in st.session_state:
-    st.session_state.custom_goals = []
 if 'optimization_rules' not in st.session_state:
     st.session_state.optimization_rules = {}
 
@@ -98,7 +131,12 @@ def main():
     if not st.session_state.user:
         show_auth_page()
     else:
-        show_main_app()
+        # Один прогон профилировщика на перезапуск скрипта
+        profiling.start_run()
+        try:
+            show_main_app()
+        finally:
+            profiling.finish_run()
 
 def show_auth_page():
     """Страница авторизации с улучшенной безопасностью"""
@@ -302,6 +340,14 @@ def register_user(username, email, password):
 
 def show_main_app():
     """Главное приложение"""
+    # Загружаем данные: снимок строится в фоне, здесь только берется ссылка
+    refresher = get_refresher()
+    snapshot = load_transaction_data()
+    if snapshot is None:
+        st.error(f"Не удалось загрузить данные: {refresher.stats['last_error']}")
+        return
+    transactions = snapshot.transactions
+    
     with st.sidebar:
         st.success(f"👋 Привет, {st.session_state.user['name']}!")
         
@@ -317,38 +363,98 @@ def show_main_app():
             ]
         )
         
+        load_stats = snapshot.stats
+        age = time.time() - snapshot.loaded_at
+        st.caption(f"🗄️ {load_stats['rows']:,} транзакций, "
+                   f"{load_stats.get('cache', load_stats.get('mode'))}, обновлено {age:,.0f} с назад")
+        if refresher.stats['last_error']:
+            st.caption(f"⚠️ Обновление не удалось: {refresher.stats['last_error']}")
+        if st.button("🔄 Проверить обновления", use_container_width=True):
+            refresher.refresh_now()
+        
         st.markdown("---")
         if st.button("🚪 Выйти", type="secondary", use_container_width=True):
             st.session_state.user = None
             st.rerun()
     
-    # Загружаем данные
-    transaction_df = load_transaction_data()
-    
-    if transaction_df.empty:
+    if transactions.empty:
         st.error("Не удалось загрузить данные. Проверьте файл data/csvjson.json")
         return
     
+    # Агрегаты построены фоновым потоком вместе со снимком и общие для всех страниц
+    version = snapshot.version
+    aggregates = snapshot.aggregates
+    current_session().dataset = version
+    
     # Отображаем выбранную страницу
-    if menu == "📊 Дашборд":
-        show_dashboard(transaction_df)
-    elif menu == "🎯 Мои цели":
-        show_goals_page(transaction_df)
-    elif menu == "💸 Транзакции":
-        show_transactions_page(transaction_df)
-    elif menu == "⚡ Оптимизация":
-        show_optimization_page(transaction_df)
-    elif menu == "📈 Прогноз":
-        show_forecast_page(transaction_df)
-    elif menu == "⚙️ Анализ":
-        show_analysis_page(transaction_df)
-
-def show_dashboard(df):
+    with profiling.span(f"page:{menu}"):
+        if menu == "📊 Дашборд":
+            show_dashboard(transactions, aggregates, get_charts(version, aggregates))
+        elif menu == "🎯 Мои цели":
+            show_goals_page(aggregates)
+        elif menu == "💸 Транзакции":
+            db, user_id = get_database(), current_user_id()
+            if DATA_SOURCE == 'file':
+                # Страница читает SQLite: копия файла пользователя обновляется вместе с дашбордом
+                ensure_loaded(db, DATA_PATH, user_id)
+            show_transactions_page(db, user_id)
+        elif menu == "⚡ Оптимизация":
+            show_optimization_page(aggregates)
+        elif menu == "📈 Прогноз":
+            show_forecast_page(aggregates)
+        elif menu == "⚙️ Анализ":
+            show_analysis_page(transactions, aggregates, get_charts(version, aggregates),
+                               get_anomalies(version, transactions))
+    
+    if st.session_state.user.get('role') == 'admin':
+        show_profiling_panel(transactions, aggregates)
+
+def show_profiling_panel(transactions, aggregates):
+    """Панель профилирования в сайдбаре (только для администратора)"""
+    profiling.record_memory('transactions', transactions)
+    profiling.record_memory('aggregates', aggregates.cube)
+    snapshot = profiling.snapshot()
+    
+    with st.sidebar.expander("🛠️ Профилирование"):
+        last_run = snapshot['last_run']
+        if last_run:
+            st.caption(f"Прошлый перезапуск: {last_run['seconds'] * 1000:.0f} мс")
+            st.dataframe(pd.DataFrame(last_run['spans']).assign(
+                ms=lambda spans: (spans['seconds'] * 1000).round(1)
+            )[['name', 'ms']], hide_index=True, use_container_width=True)
+        
+        spans = pd.DataFrame(snapshot['spans']).T
+        if not spans.empty:
+            st.write("**Интервалы, мс (среднее / макс):**")
+            st.dataframe((spans[['mean', 'max']] * 1000).round(1), use_container_width=True)
+        
+        st.write("**Кэши:**")
+        st.dataframe(pd.DataFrame(snapshot['cache']).T, use_container_width=True)
+        
+        st.write("**Память:**")
+        for name, item in snapshot['memory'].items():
+            st.write(f"• {name}: {item['bytes'] / 2**20:,.1f} МБ, {item['rows']:,} строк, "
+                     f"{item['bytes'] / max(item['rows'], 1):,.1f} байт/строку")
+        
+        sessions = get_sessions().memory_report(get_store())
+        st.write(f"**Сессии:** {len(sessions['sessions'])}, состояние "
+                 f"{sessions['session_bytes'] / 2**10:,.1f} КБ (потолок сессии "
+                 f"{sessions['session_cap'] / 2**10:,.0f} КБ), общие наборы "
+                 f"{sessions['dataset_bytes'] / 2**20:,.1f} МБ")
+        if sessions['sessions']:
+            st.dataframe(pd.DataFrame(sessions['sessions']), hide_index=True, use_container_width=True)
+        
+        st.download_button("⬇️ Лог (JSON)", profiling.to_json_lines(),
+                           file_name="profile.jsonl", mime="application/json")
+        st.download_button("⬇️ Метрики (Prometheus)", profiling.to_prometheus(),
+                           file_name="metrics.prom", mime="text/plain")
+
+def show_dashboard(transactions, aggregates, charts):
     """Дашборд с данными из csvjson.json"""
     st.header("📊 Финансовый дашборд")
     
     # Расчет статистики
-    summary = get_financial_summary(df)
+    summary = get_financial_summary(aggregates)
     
     # Ключевые метрики
     col1, col2, col3, col4 = st.columns(4)
@@ -370,10 +476,8 @@ def show_dashboard(df):
     # Последние транзакции
     st.subheader("💸 Последние операции")
     
-    recent_df = df.sort_values('date', ascending=False).head(10).copy()
-    recent_df['Дата'] = recent_df['date'].dt.strftime('%d.%m.%Y')
-    recent_df['Сумма'] = recent_df['amount'].apply(lambda x: f"{x:+,.2f} ₽")
-    recent_df['Тип'] = recent_df['type'].apply(lambda x: '📈 Доход' if x == 'income' else '📉 Трата')
+    recent_df = transactions.to_frame(transactions.recent(10))
+    recent_df = display_columns(recent_df)
     
     st.dataframe(
         recent_df[['Дата', 'Тип', 'category', 'Сумма', 'description']],
@@ -408,24 +512,17 @@ def show_dashboard(df):
             )
         
         with col2:
-            # Круговая диаграмма
-            fig, ax = plt.subplots(figsize=(8, 6))
-            ax.pie(
-                summary['expense_by_category'].values,
-                labels=summary['expense_by_category'].index,
-                autopct='%1.1f%%',
-                startangle=90
-            )
-            ax.set_title('Распределение расходов')
-            ax.axis('equal')
-            st.pyplot(fig)
+            # Круговая диаграмма (построена один раз на версию данных)
+            st.plotly_chart(charts['expense_pie'], use_container_width=True)
 
-def show_goals_page(df):
+def show_goals_page(aggregates):
     """Страница целей на основе данных"""
+    custom_goals = current_goals()
+    
     st.header("🎯 Финансовые цели")
     
     # Автоматические цели на основе расходов
-    auto_goals = get_goals_progress(df)
+    auto_goals = get_goals_progress(aggregates)
     
     st.info("💡 Цели созданы автоматически на основе ваших расходов по категориям")
     
@@ -471,22 +568,18 @@ def show_goals_page(df):
             months = st.slider("Срок (месяцев)", 1, 36, 12)
         
         if st.form_submit_button("Добавить цель"):
-            st.session_state.custom_goals.append({
-                'name': goal_name,
-                'amount': goal_amount,
-                'category': goal_category,
-                'months': months,
-                'saved': 0,
-                'created': datetime.now().strftime('%Y-%m-%d')
-            })
+            get_goal_repository().create(
+                current_user_id(), goal_name, goal_amount,
+                category=goal_category, months=months
+            )
             st.success(f"Цель '{goal_name}' добавлена!")
             st.rerun()
     
     # Показываем ручные цели
-    if st.session_state.custom_goals:
+    if custom_goals:
         st.subheader("📝 Мои цели")
         
-        for goal in st.session_state.custom_goals:
+        for goal in custom_goals:
             progress = goal['saved'] / goal['amount'] if goal['amount'] > 0 else 0
             monthly = goal['amount'] / goal['months']
             
@@ -499,16 +592,27 @@ def show_goals_page(df):
             
             with col2:
                 st.metric("В месяц", f"{monthly:,.0f} ₽")
+            
+            with st.expander("💰 Пополнить / удалить"):
+                deposit = st.number_input("Сумма пополнения", 0, step=1000, key=f"deposit_{goal['id']}")
+                col_add, col_delete = st.columns(2)
+                with col_add:
+                    if st.button("Внести", key=f"add_{goal['id']}", use_container_width=True) and deposit:
+                        # Версия, с которой пользователь видел цель: чужое изменение не затирается
+                        if get_goal_repository().add_saved(current_user_id(), goal['id'], deposit, goal['version']):
+                            st.rerun()
+                        else:
+                            st.warning("Цель изменилась в другой вкладке — данные обновлены, повторите")
+                with col_delete:
+                    if st.button("🗑️ Удалить", key=f"delete_{goal['id']}", use_container_width=True):
+                        get_goal_repository().delete(current_user_id(), goal['id'])
+                        st.rerun()
 
-def show_transactions_page(df):
-    """Страница транзакций"""
+def show_transactions_page(db, user_id):
+    """Страница транзакций пользователя user_id"""
     st.header("💸 Транзакции")
     
-    # Проверяем наличие колонки date
-    if 'date' not in df.columns:
-        st.error("В данных отсутствует колонка 'date'")
-        st.write("Доступные колонки:", df.columns.tolist())
-        return
+    first_date, last_date = date_bounds(db, user_id)
     
     # Фильтры
     col1, col2, col3 = st.columns(3)
@@ -516,77 +620,59 @@ def show_transactions_page(df):
     with col1:
         start_date = st.date_input(
             "Начальная дата",
-            df['date'].min().date() if not df.empty else datetime.now().date()
+            first_date or datetime.now().date()
         )
     
     with col2:
         end_date = st.date_input(
             "Конечная дата", 
-            df['date'].max().date() if not df.empty else datetime.now().date()
+            last_date or datetime.now().date()
         )
     
     with col3:
-        categories = ['Все'] + sorted(df['category'].unique().tolist())
-        selected_category = st.selectbox("Категория", categories)
+        category_options = [ALL_CATEGORIES] + categories(db, user_id)
+        selected_category = st.selectbox("Категория", category_options)
     
-    # Применяем фильтры
-    filtered_df = df.copy()
-    filtered_df = filtered_df[
-        (filtered_df['date'].dt.date >= start_date) & 
-        (filtered_df['date'].dt.date <= end_date)
-    ]
-    
-    if selected_category != 'Все':
-        filtered_df = filtered_df[filtered_df['category'] == selected_category]
+    # Фильтры выполняются в SQLite по индексам, в память попадает только выборка
+    filters = dict(user_id=user_id, start_date=start_date, end_date=end_date, category=selected_category)
+    totals = period_totals(db, **filters)
     
     # Показываем транзакции
-    if not filtered_df.empty:
+    if totals['count'] > 0:
         # Статистика
         st.subheader("📈 Статистика за период")
         
-        period_income = filtered_df[filtered_df['type'] == 'income']['amount'].sum()
-        period_expense = abs(filtered_df[filtered_df['type'] == 'expense']['amount'].sum())
-        
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.metric("Количество", len(filtered_df))
+            st.metric("Количество", totals['count'])
         
         with col2:
-            st.metric("Доходы", f"{period_income:,.2f} ₽")
+            st.metric("Доходы", f"{totals['income']:,.2f} ₽")
         
         with col3:
-            st.metric("Расходы", f"{period_expense:,.2f} ₽")
+            st.metric("Расходы", f"{totals['expense']:,.2f} ₽")
         
-        # Таблица транзакций
+        # Таблица транзакций: только видимая страница, пагинация по ключу (date, id)
         st.subheader("📋 Детали транзакций")
         
-        display_df = filtered_df.copy()
-        display_df['Дата'] = display_df['date'].dt.strftime('%d.%m.%Y')
-        display_df['Сумма'] = display_df['amount'].apply(lambda x: f"{x:+,.2f} ₽")
-        display_df['Тип'] = display_df['type'].apply(lambda x: '📈 Доход' if x == 'income' else '📉 Трата')
-        
-        # СОРТИРОВКА ИСПРАВЛЕНА: сортируем по исходной колонке date, а не по переименованной
-        display_df = display_df.sort_values('date', ascending=False)
+        display_df, page_number, page_count = show_transactions_pager(db, filters, totals['count'])
+        display_df = display_columns(display_df)
         
         st.dataframe(
             display_df[['Дата', 'Тип', 'category', 'Сумма', 'description']],
             use_container_width=True,
             hide_index=True
         )
+        st.caption(f"Страница {page_number} из {page_count}")
         
         # Топ-5 самых крупных трат
         st.subheader("🔥 Топ-5 самых крупных трат")
         
-        top_expenses = filtered_df[filtered_df['type'] == 'expense'].copy()
-        if not top_expenses.empty:
-            top_expenses = top_expenses.nsmallest(5, 'amount')
-            
-            top_display = top_expenses.copy()
-            top_display['Дата'] = top_display['date'].dt.strftime('%d.%m.%Y')
-            top_display['Сумма'] = top_display['amount'].apply(lambda x: f"{x:+,.2f} ₽")
-            top_display['abs_amount'] = top_display['amount'].abs()
-            top_display = top_display.sort_values('abs_amount', ascending=False)
+        top_display = top_expenses(db, limit=5, **filters)
+        if not top_display.empty:
+            top_display['Дата'] = format_dates(top_display['date'])
+            top_display['Сумма'] = format_money(top_display['amount'])
             
             st.dataframe(
                 top_display[['Дата', 'category', 'Сумма', 'description']],
@@ -595,16 +681,100 @@ def show_transactions_page(df):
             )
     else:
         st.info("Нет транзакций за выбранный период")
+    
+    show_category_rules(db, user_id)
 
-def show_optimization_page(df):
+def show_category_rules(db, user_id):
+    """Правила автокатегоризации: список, добавление и удаление"""
+    categorizer = RuleCategorizer(db)
+    
+    with st.expander("🏷️ Правила категорий"):
+        st.caption(f"Правила меняют только операции без категории («{UNCATEGORIZED}») "
+                   "и уже назначенные правилами; ручные не трогаются")
+        
+        with st.form("category_rule_form"):
+            col1, col2, col3 = st.columns([2, 2, 1])
+            with col1:
+                pattern = st.text_input("Описание содержит")
+                is_regex = st.checkbox("Регулярное выражение")
+            with col2:
+                category = st.text_input("Категория")
+                tx_type = st.selectbox("Тип", ['любой', 'expense', 'income'])
+            with col3:
+                priority = st.number_input("Приоритет", 0, 100, 0)
+            
+            if st.form_submit_button("Добавить правило"):
+                try:
+                    _, stats = categorizer.add_rule(
+                        user_id, pattern, category,
+                        kind='regex' if is_regex else 'substring',
+                        tx_type=None if tx_type == 'любой' else tx_type, priority=priority
+                    )
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.success(f"Правило добавлено, перекатегоризировано {stats['updated']:,} операций")
+        
+        for rule in categorizer.rules(user_id):
+            col1, col2 = st.columns([5, 1])
+            with col1:
+                st.write(f"`{rule['pattern']}` → **{rule['category']}**"
+                         f"{' (' + rule['type'] + ')' if rule['type'] else ''}, приоритет {rule['priority']}")
+            with col2:
+                if st.button("🗑️", key=f"rule_delete_{rule['id']}"):
+                    try:
+                        categorizer.delete_rule(user_id, rule['id'])
+                    except ValueError as e:
+                        st.error(str(e))
+                    else:
+                        st.rerun()
+
+def show_transactions_pager(db, filters, total_count):
+    """Навигация по страницам транзакций
+
+    В session_state хранится стек курсоров (date, id) начала каждой
+    открытой страницы; при смене фильтров он сбрасывается.
+    """
+    col1, col2, col3 = st.columns([1, 1, 2])
+    
+    with col3:
+        page_size = st.selectbox(
+            "Строк на странице", PAGE_SIZES,
+            index=PAGE_SIZES.index(PAGE_SIZE), key="tx_page_size"
+        )
+    
+    state_key = (tuple(str(value) for value in filters.values()), page_size)
+    if st.session_state.get('tx_page_key') != state_key:
+        st.session_state.tx_page_key = state_key
+        st.session_state.tx_page_cursors = [None]
+    cursors = st.session_state.tx_page_cursors
+    
+    page_df, next_cursor = fetch_page(db, cursor=cursors[-1], page_size=page_size, **filters)
+    
+    with col1:
+        if st.button("⬅️ Назад", disabled=len(cursors) == 1, use_container_width=True):
+            cursors.pop()
+            st.rerun()
+    
+    with col2:
+        if st.button("Вперед ➡️", disabled=next_cursor is None, use_container_width=True):
+            cursors.append(next_cursor)
+            st.rerun()
+    
+    page_count = max(1, -(-total_count // page_size))
+    return page_df, len(cursors), page_count
+
+def show_optimization_page(aggregates):
     """Страница оптимизации расходов"""
+    custom_goals = current_goals()
+    
     st.header("⚡ Оптимизация расходов")
     
-    if df.empty:
+    if aggregates.rows == 0:
         st.info("Нет данных для анализа")
         return
     
-    expense_by_category = df[df['type'] == 'expense'].groupby('category')['amount'].sum().abs()
+    expense_by_category = aggregates.by_category('expense').abs()
     
     if expense_by_category.empty:
         st.info("Нет данных о расходах")
@@ -658,8 +828,8 @@ def show_optimization_page(df):
         st.subheader("🎯 Влияние на ваши цели")
         
         # Предполагаем, что сэкономленные деньги идут в накопления
-        if st.session_state.custom_goals:
-            for goal in st.session_state.custom_goals[:3]:  # Первые 3 цели
+        if custom_goals:
+            for goal in custom_goals[:3]:  # Первые 3 цели
                 remaining = goal['amount'] - goal['saved']
                 
                 # Без оптимизации
@@ -693,19 +863,18 @@ def show_optimization_page(df):
     else:
         st.warning("Выберите категории для сокращения чтобы увидеть эффект")
 
-def show_forecast_page(df):
+def show_forecast_page(aggregates):
     """Страница прогноза"""
+    custom_goals = current_goals()
+    
     st.header("📈 Прогноз накоплений")
     
-    if df.empty:
+    if aggregates.rows == 0:
         st.info("Нет данных для прогноза")
         return
     
-    # Анализ текущих доходов и расходов
-    monthly_income = df[df['type'] == 'income']['amount'].sum() / 3  # Предполагаем 3 месяца данных
-    monthly_expense = abs(df[df['type'] == 'expense']['amount'].sum()) / 3
-    
-    current_savings_rate = monthly_income - monthly_expense
+    # Анализ текущих доходов и расходов (предполагаем 3 месяца данных)
+    monthly_income, monthly_expense, current_savings_rate = current_rates(aggregates)
     
     st.subheader("📊 Текущая ситуация")
     
@@ -723,10 +892,10 @@ def show_forecast_page(df):
     st.markdown("---")
     
     # Прогноз для целей
-    if st.session_state.custom_goals:
+    if custom_goals:
         st.subheader("🎯 Прогноз по вашим целям")
         
-        for goal in st.session_state.custom_goals:
+        for goal in custom_goals:
             remaining = goal['amount'] - goal['saved']
             
             # Параметры прогноза
@@ -751,17 +920,8 @@ def show_forecast_page(df):
             # Расчеты
             months_no_invest = remaining / monthly_input if monthly_input > 0 else 999
             
-            # С инвестициями
-            monthly_return = return_rate / 12 / 100
-            if monthly_return > 0:
-                n = 0
-                current = goal['saved']
-                while current < goal['amount'] and n < 600:
-                    current = current * (1 + monthly_return) + monthly_input
-                    n += 1
-                months_with_invest = n
-            else:
-                months_with_invest = months_no_invest
+            # С инвестициями — аннуитет в замкнутой форме вместо помесячного цикла
+            months_with_invest = months_to_goal(goal['saved'], goal['amount'], monthly_input, return_rate)
             
             # Отображение
             col1, col2 = st.columns(2)
@@ -780,47 +940,90 @@ def show_forecast_page(df):
                 )
             
             st.divider()
+        
+        show_sensitivity_tables(custom_goals, current_savings_rate)
+        show_goal_simulation(aggregates, custom_goals)
     else:
         st.info("Создайте финансовые цели чтобы увидеть прогноз")
 
-def show_analysis_page(df):
+def show_sensitivity_tables(goals, current_savings_rate):
+    """Сроки по сетке взнос × доходность для всех целей сразу"""
+    with st.expander("🧮 Чувствительность: срок (мес) при разных взносах и доходности"):
+        base = max(float(current_savings_rate), 10000.0)
+        contributions = np.round(base * np.array([0.5, 0.75, 1.0, 1.5, 2.0]), -3)
+        rates = np.array([0.0, 3.0, 5.0, 7.0, 10.0, 15.0])
+        
+        # Один вызов NumPy на все цели: массив (цели × взносы × ставки)
+        grid = sensitivity_grid(
+            [goal['saved'] for goal in goals],
+            [goal['amount'] for goal in goals],
+            contributions, rates
+        )
+        
+        for goal, goal_grid in zip(goals, grid):
+            st.markdown(f"**{goal['name']}**")
+            st.dataframe(
+                sensitivity_table(goal_grid, contributions, rates).style.format("{:.1f}"),
+                use_container_width=True
+            )
+
+def show_goal_simulation(aggregates, goals):
+    """Вероятность достичь целей к сроку по Монте-Карло"""
+    with st.expander("🎲 Вероятность достижения целей (Монте-Карло)"):
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            annual_return = st.slider("Средняя доходность, % годовых", 0.0, 15.0, 7.0, 0.5, key="mc_return")
+        
+        with col2:
+            annual_volatility = st.slider("Волатильность, % годовых", 0.0, 40.0, 10.0, 1.0, key="mc_volatility")
+        
+        with col3:
+            n_paths = st.select_slider("Сценариев", [1000, 5000, 10000, 50000], value=10000, key="mc_paths")
+        
+        # Доходы и расходы месяца берутся из истории пользователя
+        result = simulate_goals(
+            monthly_history(aggregates), goals,
+            n_paths=n_paths, annual_return=annual_return,
+            annual_volatility=annual_volatility, seed=42
+        )
+        
+        st.dataframe(
+            pd.DataFrame({
+                'Цель': [goal['name'] for goal in goals],
+                'Срок (мес)': [goal['months'] for goal in goals],
+                'Вероятность': result['probability'] * 100,
+                'Средний баланс к сроку': result['mean_balance'],
+            }),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'Вероятность': st.column_config.ProgressColumn(format="%.1f%%", min_value=0, max_value=100),
+                'Средний баланс к сроку': st.column_config.NumberColumn(format="%.0f ₽"),
+            }
+        )
+        st.caption(f"{result['paths']:,} сценариев за {result['seconds']:.2f} с")
+
+def show_analysis_page(transactions, aggregates, charts, anomalies):
     """Страница углубленного анализа"""
     st.header("⚙️ Детальный анализ")
     
-    if df.empty:
+    if aggregates.rows == 0:
         st.info("Нет данных для анализа")
         return
     
     # Анализ по времени
     st.subheader("📅 Анализ по времени")
     
-    df['month'] = df['date'].dt.to_period('M')
-    monthly_data = df.groupby(['month', 'type'])['amount'].sum().unstack(fill_value=0)
-    
-    if not monthly_data.empty:
+    if 'monthly_lines' in charts:
         # График доходов и расходов по месяцам
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        if 'income' in monthly_data.columns:
-            ax.plot(monthly_data.index.astype(str), monthly_data['income'], label='Доходы', marker='o')
-        
-        if 'expense' in monthly_data.columns:
-            ax.plot(monthly_data.index.astype(str), abs(monthly_data['expense']), label='Расходы', marker='s')
-        
-        ax.set_xlabel('Месяц')
-        ax.set_ylabel('Сумма (руб)')
-        ax.set_title('Динамика доходов и расходов')
-        ax.legend()
-        ax.grid(True, alpha=0.3)
-        plt.xticks(rotation=45)
-        
-        st.pyplot(fig)
+        st.plotly_chart(charts['monthly_lines'], use_container_width=True)
     
     # Анализ привычек
     st.subheader("📊 Анализ финансовых привычек")
     
     # Самые частые категории трат
-    frequent_categories = df[df['type'] == 'expense']['category'].value_counts().head(5)
+    frequent_categories = aggregates.category_counts('expense').head(5)
     
     if not frequent_categories.empty:
         col1, col2 = st.columns(2)
@@ -832,18 +1035,19 @@ def show_analysis_page(df):
         
         with col2:
             # Дни недели с наибольшими тратами
-            df['weekday'] = df['date'].dt.day_name()
-            weekday_expenses = df[df['type'] == 'expense'].groupby('weekday')['amount'].sum().abs()
+            weekday_expenses = aggregates.by_weekday('expense').abs()
             
             if not weekday_expenses.empty:
                 st.write("**Траты по дням недели:**")
                 for day, amount in weekday_expenses.sort_values(ascending=False).items():
                     st.write(f"• {day}: {amount:,.0f} руб")
     
+    show_anomalies(transactions, anomalies)
+    
     # Рекомендации
     st.subheader("💡 Рекомендации")
     
-    expense_by_category = df[df['type'] == 'expense'].groupby('category')['amount'].sum().abs()
+    expense_by_category = aggregates.by_category('expense').abs()
     
     if not expense_by_category.empty:
         # Находим категорию с наибольшими расходами
@@ -864,5 +1068,40 @@ def show_analysis_page(df):
         for rec in recommendations:
             st.write(f"• {rec}")
 
+def show_anomalies(transactions, anomalies):
+    """Возможные дубликаты и необычно крупные операции"""
+    st.subheader("🚨 Дубликаты и необычные операции")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Точные дубликаты", f"{len(anomalies['exact']):,}")
+    with col2:
+        st.metric("Похожие операции", f"{len(anomalies['near']):,}")
+    with col3:
+        st.metric("Необычные суммы", f"{len(anomalies['outliers']):,}")
+    
+    if len(anomalies['exact']) or len(anomalies['near']):
+        st.write("**Возможные дубликаты** (та же сумма и категория, совпадающая или близкая дата):")
+        duplicates = display_columns(duplicates_frame(transactions, anomalies, limit=50))
+        duplicates['Исходная'] = format_dates(duplicates['original_date'])
+        st.dataframe(
+            duplicates[['Дата', 'Исходная', 'kind', 'Тип', 'category', 'Сумма', 'description']],
+            use_container_width=True,
+            hide_index=True
+        )
+    
+    if len(anomalies['outliers']):
+        st.write("**Необычно крупные суммы** относительно последних операций категории:")
+        outliers = display_columns(outliers_frame(transactions, anomalies, limit=50))
+        outliers['Обычно'] = format_money(outliers['typical'])
+        st.dataframe(
+            outliers[['Дата', 'Тип', 'category', 'Сумма', 'Обычно', 'z', 'description']],
+            use_container_width=True,
+            hide_index=True
+        )
+    
+    if not (len(anomalies['exact']) or len(anomalies['near']) or len(anomalies['outliers'])):
+        st.success("Дубликатов и необычных операций не найдено")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,187 @@
+# app/profiling.py
+"""Профилирование перезапусков Streamlit
+
+Каждый перезапуск скрипта — отдельный прогон: вложенные интервалы
+span('...') замеряют загрузку данных, агрегаты и страницы, декораторы
+cache_calls / cache_misses считают попадания в кэши st.cache_*, а
+record_memory запоминает размер DataFrame. Последние прогоны хранятся в
+памяти процесса и выгружаются JSON-строками или в текстовом формате
+Prometheus.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+HISTORY_SIZE = 200
+# Файл для JSON-строк по каждому прогону (по умолчанию не пишется)
+PROFILE_LOG = os.environ.get('PROFILE_LOG')
+
+_local = threading.local()
+_lock = threading.Lock()
+_history = deque(maxlen=HISTORY_SIZE)
+_cache_stats = defaultdict(lambda: {'calls': 0, 'misses': 0})
+_memory = {}
+
+
+def start_run():
+    """Начало нового прогона в текущем потоке сессии"""
+    _local.run = {'started': time.time(), 'spans': [], 'seconds': None}
+    _local.stack = []
+    _local.clock = time.perf_counter()
+
+
+def finish_run():
+    """Завершение прогона: в историю и (если задан PROFILE_LOG) в лог"""
+    run = getattr(_local, 'run', None)
+    if run is None:
+        return None
+    run['seconds'] = time.perf_counter() - _local.clock
+    _local.run = None
+    with _lock:
+        _history.append(run)
+    if PROFILE_LOG:
+        with open(PROFILE_LOG, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(run, ensure_ascii=False) + '\n')
+    return run
+
+
+@contextmanager
+def span(name):
+    """Интервал внутри прогона; вложенные получают имя вида 'page/summary'"""
+    run = getattr(_local, 'run', None)
+    if run is None:
+        yield
+        return
+    _local.stack.append(name)
+    path = '/'.join(_local.stack)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        run['spans'].append({'name': path, 'seconds': time.perf_counter() - started})
+        _local.stack.pop()
+
+
+def cache_calls(func):
+    """Внешний декоратор кэшируемой функции: счетчик вызовов и интервал"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _lock:
+            _cache_stats[func.__name__]['calls'] += 1
+        with span(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def cache_misses(func):
+    """Внутренний декоратор: тело выполняется только при промахе кэша"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _lock:
+            _cache_stats[func.__name__]['misses'] += 1
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def record_memory(name, frame):
+    """Размер DataFrame (deep) в байтах; для mmap-колонок — размер массивов"""
+    size = int(frame.memory_usage(deep=True, index=True).sum())
+    with _lock:
+        _memory[name] = {'bytes': size, 'rows': len(frame)}
+    return size
+
+
+def cache_stats():
+    """Вызовы, промахи и попадания по каждой кэшируемой функции"""
+    with _lock:
+        return {
+            name: {**stats, 'hits': stats['calls'] - stats['misses']}
+            for name, stats in _cache_stats.items()
+        }
+
+
+def span_summary(runs=None):
+    """Число, среднее и максимум по каждому интервалу за последние прогоны"""
+    with _lock:
+        history = list(_history)[-runs:] if runs else list(_history)
+    totals = defaultdict(list)
+    for run in history:
+        totals['run'].append(run['seconds'])
+        for item in run['spans']:
+            totals[item['name']].append(item['seconds'])
+    return {
+        name: {'count': len(values), 'mean': sum(values) / len(values), 'max': max(values)}
+        for name, values in totals.items()
+    }
+
+
+def snapshot():
+    """Все показатели одним словарем"""
+    with _lock:
+        last = _history[-1] if _history else None
+        memory = dict(_memory)
+    return {
+        'last_run': last,
+        'spans': span_summary(),
+        'cache': cache_stats(),
+        'memory': memory,
+    }
+
+
+def to_json_lines():
+    """История прогонов JSON-строками (одна строка — один прогон)"""
+    with _lock:
+        history = list(_history)
+    return ''.join(json.dumps(run, ensure_ascii=False) + '\n' for run in history)
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def to_prometheus():
+    """Текстовый формат Prometheus: интервалы, кэши, память"""
+    lines = [
+        '# HELP app_span_seconds_mean Среднее время интервала за последние прогоны',
+        '# TYPE app_span_seconds_mean gauge',
+    ]
+    summary = span_summary()
+    lines += [f'app_span_seconds_mean{{span="{_label(name)}"}} {item["mean"]:.6f}'
+              for name, item in summary.items()]
+    lines += ['# TYPE app_span_seconds_max gauge']
+    lines += [f'app_span_seconds_max{{span="{_label(name)}"}} {item["max"]:.6f}'
+              for name, item in summary.items()]
+    # Число по скользящему окну прогонов может уменьшаться — это gauge, не counter
+    lines += ['# HELP app_span_count Число интервалов за последние прогоны',
+              '# TYPE app_span_count gauge']
+    lines += [f'app_span_count{{span="{_label(name)}"}} {item["count"]}'
+              for name, item in summary.items()]
+
+    lines += ['# HELP app_cache_calls_total Вызовы кэшируемых функций',
+              '# TYPE app_cache_calls_total counter']
+    stats = cache_stats()
+    for name, item in stats.items():
+        lines.append(f'app_cache_calls_total{{function="{_label(name)}"}} {item["calls"]}')
+    lines += ['# TYPE app_cache_misses_total counter']
+    for name, item in stats.items():
+        lines.append(f'app_cache_misses_total{{function="{_label(name)}"}} {item["misses"]}')
+
+    lines += ['# HELP app_frame_bytes Размер DataFrame в памяти',
+              '# TYPE app_frame_bytes gauge']
+    with _lock:
+        memory = dict(_memory)
+    for name, item in memory.items():
+        lines.append(f'app_frame_bytes{{frame="{_label(name)}"}} {item["bytes"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    """Очистка истории и счетчиков"""
+    with _lock:
+        _history.clear()
+        _cache_stats.clear()
+        _memory.clear()
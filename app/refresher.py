@@ -0,0 +1,183 @@
+# app/refresher.py
+"""Фоновое обновление набора транзакций и куба агрегатов
+
+DataRefresher в отдельном потоке раз в interval секунд сверяет подпись
+источника (файл или таблица transactions) и при изменении строит новый
+снимок — CompactTransactions и TransactionCube — вне потока запроса. Готовый снимок
+подменяется одной операцией присваивания, поэтому сессии до этого момента
+продолжают работать с предыдущим.
+"""
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+from app.aggregates import TransactionCube
+from app.cache import load_cached, source_fingerprint
+from app.compact import CompactTransactions
+
+REFRESH_INTERVAL = 5.0
+FIRST_LOAD_TIMEOUT = 120.0
+
+# Неизменяемый снимок данных: все поля соответствуют одной версии источника
+Snapshot = namedtuple('Snapshot', 'transactions aggregates version stats loaded_at')
+
+
+class FileSource:
+    """JSON-файл через дисковый кэш; изменение — по mtime и размеру"""
+
+    def __init__(self, path, store=None):
+        self.path = path
+        self.store = store
+
+    def signature(self):
+        fingerprint = source_fingerprint(self.path)
+        return fingerprint['mtime_ns'], fingerprint['size']
+
+    def load(self, previous=None):
+        """Полная перезагрузка: (транзакции, куб, stats); та же версия файла — тот же набор из store"""
+        mtime_ns, size = self.signature()
+        version = f'{self.path}@{mtime_ns}-{size}'
+
+        def loader():
+            df, stats = load_cached(self.path)
+            return CompactTransactions.from_frame(df), dict(stats, version=version)
+
+        transactions, stats = self.store.get_or_load(version, loader) if self.store is not None else loader()
+        return transactions, TransactionCube.from_compact(transactions), stats
+
+
+class DatabaseSource:
+    """Таблица transactions одного пользователя
+
+    Подпись — MAX(id), число строк по свертке и счетчик правок и удалений
+    (transaction_revisions, ведется триггерами). Если добавились только
+    новые строки, читаются лишь они и прибавляются к кубу через append;
+    при удалениях и правках (в том числе переклассификации) набор
+    перечитывается целиком.
+    """
+
+    def __init__(self, db, user_id=1):
+        self.db = db
+        self.user_id = user_id
+
+    def signature(self):
+        max_id = self.db.execute_query(
+            "SELECT COALESCE(MAX(id), 0) FROM transactions WHERE user_id = ?", (self.user_id,)
+        )[0][0]
+        count = self.db.execute_query(
+            "SELECT COALESCE(SUM(count), 0) FROM rollup_monthly WHERE user_id = ?", (self.user_id,)
+        )[0][0]
+        revision = self.db.execute_query(
+            "SELECT COALESCE(MAX(revision), 0) FROM transaction_revisions WHERE user_id = ?",
+            (self.user_id,)
+        )[0][0]
+        return max_id, count, revision
+
+    def _read(self, after_id, upto_id):
+        """Строки пользователя с after_id < id <= upto_id"""
+        df = self.db.get_dataframe(
+            "SELECT id, amount, category, date, type, description FROM transactions "
+            "WHERE user_id = ? AND id > ? AND id <= ? ORDER BY id",
+            (self.user_id, after_id, upto_id)
+        )
+        df['date'] = pd.to_datetime(df['date'])
+        df['description'] = df['description'].fillna('')
+        return df
+
+    def load(self, previous=None):
+        max_id, count, revision = self.signature()
+        last_id = previous.stats['max_id'] if previous is not None else None
+        appended_only = (
+            previous is not None
+            and revision == previous.stats['revision']
+            and count - previous.stats['rows'] == max_id - last_id
+            and max_id >= last_id
+        )
+
+        if appended_only:
+            batch = self._read(last_id, max_id)
+            transactions = previous.transactions.append(CompactTransactions.from_frame(batch))
+            aggregates = previous.aggregates.append(batch)
+            mode = 'incremental'
+        else:
+            transactions = CompactTransactions.from_frame(self._read(0, max_id))
+            aggregates = TransactionCube.from_compact(transactions)
+            mode = 'full'
+
+        stats = {'rows': len(transactions), 'max_id': max_id, 'revision': revision, 'mode': mode,
+                 'version': f'db-{self.user_id}-{max_id}-{len(transactions)}-{revision}'}
+        return transactions, aggregates, stats
+
+
+class DataRefresher:
+    """Фоновый поток, держащий актуальный снимок источника"""
+
+    def __init__(self, source, interval=REFRESH_INTERVAL, on_swap=None):
+        self.source = source
+        self.interval = interval
+        self.on_swap = on_swap
+        self._snapshot = None
+        self._signature = None
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {'reloads': 0, 'checks': 0, 'last_error': None,
+                      'last_check': None, 'last_reload_seconds': None}
+
+    def start(self):
+        """Запуск потока; первый снимок строится тоже в нем"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='data-refresher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def refresh_now(self):
+        """Проверить источник, не дожидаясь интервала"""
+        self._wake.set()
+
+    def snapshot(self, timeout=FIRST_LOAD_TIMEOUT):
+        """Текущий снимок; ждет только самый первый (None, если не успел)"""
+        if self._snapshot is None:
+            self._ready.wait(timeout)
+        return self._snapshot
+
+    def check(self):
+        """Одна проверка источника и, при изменении, перестройка снимка"""
+        self.stats['checks'] += 1
+        self.stats['last_check'] = time.time()
+        signature = self.source.signature()
+        if signature == self._signature and self._snapshot is not None:
+            return False
+
+        started = time.perf_counter()
+        previous = self._snapshot
+        transactions, aggregates, stats = self.source.load(previous)
+        snapshot = Snapshot(transactions, aggregates, stats.get('version'), stats, time.time())
+        # Подмена ссылки атомарна: читатели видят старый или новый снимок целиком
+        self._snapshot = snapshot
+        self._signature = signature
+        self.stats['reloads'] += 1
+        self.stats['last_reload_seconds'] = time.perf_counter() - started
+        self._ready.set()
+        if self.on_swap is not None and previous is not None and previous.version != snapshot.version:
+            self.on_swap(previous, snapshot)
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.check()
+                self.stats['last_error'] = None
+            except Exception as e:
+                # Ошибка источника не роняет поток; остается прошлый снимок
+                self.stats['last_error'] = f"{type(e).__name__}: {e}"
+                self._ready.set()
+            self._wake.wait(self.interval)
+            self._wake.clear()
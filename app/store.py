@@ -0,0 +1,159 @@
+# app/store.py
+"""Общие наборы данных и легкое состояние сессий
+
+DatasetStore держит один экземпляр каждого набора на процесс: ключ —
+версия источника, известная до загрузки (путь, mtime и размер файла),
+поэтому набор грузится один раз, а массивы колонок помечаются только
+для чтения.
+Сессия (SessionView) хранит только версию набора и время последнего
+обращения: цели живут в GoalRepository, операции — в базе и общем
+снимке, поэтому своих данных у сессии нет. SessionRegistry выселяет
+сессии, простаивающие дольше IDLE_SECONDS, сбрасывает сессию, выросшую
+больше SESSION_MEMORY_CAP, и строит отчет о памяти.
+"""
+import sys
+import threading
+import time
+
+import numpy as np
+
+# Потолок состояния одной сессии и время простоя до выселения
+SESSION_MEMORY_CAP = 1 * 1024 * 1024
+IDLE_SECONDS = 30 * 60
+EVICT_INTERVAL = 60
+
+
+def deep_sizeof(obj, seen=None):
+    """Приблизительный размер объекта вместе с вложенными списками и словарями"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+def _freeze(df):
+    """Запрет записи в массивы колонок: общий набор нельзя изменить на месте"""
+    if hasattr(df, 'freeze'):
+        return df.freeze()
+    for name in df.columns:
+        values = df[name].array
+        array = values if isinstance(values, np.ndarray) else getattr(values, '_ndarray', None)
+        if isinstance(array, np.ndarray):
+            array.flags.writeable = False
+    return df
+
+
+class DatasetStore:
+    """Наборы данных только для чтения, общие для всех сессий процесса"""
+
+    def __init__(self):
+        self._datasets = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader):
+        """(df, stats) по ключу версии; loader() вызывается, только если набора еще нет
+
+        Ключ известен до загрузки, поэтому одновременные запросы одной
+        версии ждут на блокировке этого ключа и получают один экземпляр,
+        а другие версии грузятся параллельно.
+        """
+        with self._lock:
+            if key in self._datasets:
+                return self._datasets[key]
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._datasets:
+                    return self._datasets[key]
+            df, stats = loader()
+            with self._lock:
+                self._datasets[key] = _freeze(df), stats
+                self._loading.pop(key, None)
+                return self._datasets[key]
+
+    def discard(self, key):
+        """Забыть набор старой версии (сессии, что еще держат ссылку, дочитают его)"""
+        with self._lock:
+            self._datasets.pop(key, None)
+
+    def memory(self):
+        """Размер каждого набора в байтах по версии"""
+        with self._lock:
+            return {key: int(df.memory_usage(deep=True).sum()) for key, (df, _) in self._datasets.items()}
+
+
+class SessionView:
+    """Состояние одной сессии: версия общего набора и время последнего обращения"""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.dataset = None
+        self.last_seen = time.time()
+
+    def nbytes(self):
+        return deep_sizeof(self.__dict__)
+
+
+class SessionRegistry:
+    """Все сессии процесса: выдача, выселение простаивающих и отчет о памяти"""
+
+    def __init__(self, idle_seconds=IDLE_SECONDS, memory_cap=SESSION_MEMORY_CAP):
+        self.idle_seconds = idle_seconds
+        self.memory_cap = memory_cap
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._last_eviction = time.time()
+
+    def touch(self, session_id):
+        """Сессия по id (новая, если ее нет, она была выселена или выросла больше memory_cap)"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.nbytes() > self.memory_cap:
+                session = self._sessions[session_id] = SessionView(session_id)
+            session.last_seen = time.time()
+        if time.time() - self._last_eviction > EVICT_INTERVAL:
+            self.evict_idle()
+        return session
+
+    def evict_idle(self, now=None):
+        """Удалить сессии, простаивающие дольше idle_seconds; возвращает их id"""
+        now = now or time.time()
+        with self._lock:
+            self._last_eviction = now
+            idle = [sid for sid, session in self._sessions.items()
+                    if now - session.last_seen > self.idle_seconds]
+            for sid in idle:
+                del self._sessions[sid]
+        return idle
+
+    def memory_report(self, store=None):
+        """Память по сессиям и, если передан store, по общим наборам"""
+        now = time.time()
+        with self._lock:
+            sessions = list(self._sessions.values())
+        rows = []
+        for session in sessions:
+            nbytes = session.nbytes()
+            rows.append({
+                'session': session.session_id[:8],
+                'dataset': session.dataset,
+                'bytes': nbytes,
+                'over_cap': nbytes > self.memory_cap,
+                'idle_seconds': round(now - session.last_seen),
+            })
+        report = {
+            'sessions': rows,
+            'session_bytes': sum(row['bytes'] for row in rows),
+            'session_cap': self.memory_cap,
+        }
+        if store is not None:
+            report['datasets'] = store.memory()
+            report['dataset_bytes'] = sum(report['datasets'].values())
+        return report
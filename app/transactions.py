@@ -0,0 +1,181 @@
+# app/transactions.py
+"""Запросы страницы транзакций к таблице transactions
+
+Фильтры по периоду и категории выполняются в SQLite по индексам
+idx_transactions_user_date / idx_transactions_user_category, поэтому
+в память попадают только строки выбранного окна. Итоги и список категорий
+читаются из сверток rollup_daily / rollup_monthly. При DATA_SOURCE=file
+ensure_loaded держит копию файла в таблице в актуальном состоянии.
+"""
+import os
+import threading
+
+import pandas as pd
+
+from app.cache import source_fingerprint
+from app.categorizer import RuleCategorizer
+
+# Пользователь по умолчанию для CLI и DATA_SOURCE=db; страницы передают id вошедшего
+DEFAULT_USER_ID = 1
+
+ALL_CATEGORIES = 'Все'
+
+# Одна синхронизация файла за раз: параллельные сессии не загружают его дважды
+_sync_lock = threading.Lock()
+
+PAGE_SIZE = 50
+PAGE_SIZES = [25, 50, 100, 200]
+
+
+def _where(user_id, start_date=None, end_date=None, category=None, date_column='date'):
+    """Условие WHERE и параметры для фильтров страницы"""
+    clauses = ['user_id = ?']
+    params = [user_id]
+    if start_date is not None:
+        clauses.append(f'{date_column} >= ?')
+        params.append(str(start_date))
+    if end_date is not None:
+        clauses.append(f'{date_column} <= ?')
+        params.append(str(end_date))
+    if category and category != ALL_CATEGORIES:
+        clauses.append('category = ?')
+        params.append(category)
+    return ' AND '.join(clauses), params
+
+
+def ensure_loaded(db, path, user_id=DEFAULT_USER_ID):
+    """Копия файла в transactions пользователя, актуальная по версии файла
+
+    Версия — mtime и размер, как у FileSource. При изменении файла строки,
+    загруженные из него (source), заменяются новыми в той же транзакции;
+    остальные строки пользователя не трогаются, правила категорий
+    применяются заново. Возвращает статистику загрузки или None, если
+    файл не менялся.
+    """
+    source = os.path.abspath(path)
+    fingerprint = source_fingerprint(path)
+    version = f"{fingerprint['mtime_ns']}-{fingerprint['size']}"
+    with _sync_lock:
+        loaded = db.execute_query(
+            "SELECT version FROM dataset_imports WHERE user_id = ? AND path = ?", (user_id, source)
+        )
+        if loaded and loaded[0][0] == version:
+            return None
+
+        # Строки, загруженные до учета версий (source пуст), не дублируем
+        legacy = not loaded and db.execute_query(
+            "SELECT EXISTS (SELECT 1 FROM transactions WHERE user_id = ? AND source IS NULL)", (user_id,)
+        )[0][0]
+        with db.get_connection() as conn:
+            conn.execute("DELETE FROM transactions WHERE user_id = ? AND source = ?", (user_id, source))
+            stats = db.import_json_datasets([path], user_id=user_id, dedupe=bool(legacy))
+            conn.execute(
+                "INSERT OR REPLACE INTO dataset_imports (user_id, path, version) VALUES (?, ?, ?)",
+                (user_id, source, version)
+            )
+            conn.commit()
+
+    categorizer = RuleCategorizer(db)
+    if categorizer.rules(user_id):
+        stats['reclassified'] = categorizer.reclassify(user_id)['updated']
+    return stats
+
+
+def date_bounds(db, user_id=DEFAULT_USER_ID):
+    """Первая и последняя даты операций пользователя"""
+    first, last = db.execute_query(
+        "SELECT MIN(date), MAX(date) FROM transactions WHERE user_id = ?", (user_id,)
+    )[0]
+    if first is None:
+        return None, None
+    return pd.Timestamp(first).date(), pd.Timestamp(last).date()
+
+
+def categories(db, user_id=DEFAULT_USER_ID):
+    """Отсортированный список категорий пользователя"""
+    rows = db.execute_query(
+        "SELECT DISTINCT category FROM rollup_monthly WHERE user_id = ? ORDER BY category", (user_id,)
+    )
+    return [row[0] for row in rows]
+
+
+def period_totals(db, user_id=DEFAULT_USER_ID, start_date=None, end_date=None, category=None):
+    """Количество, доходы и расходы за период по дневной свертке"""
+    where, params = _where(user_id, start_date, end_date, category, date_column='day')
+    count, income, expense = db.execute_query(
+        f"""
+        SELECT COALESCE(SUM(count), 0),
+               COALESCE(SUM(CASE WHEN type = 'income' THEN amount END), 0),
+               COALESCE(SUM(CASE WHEN type = 'expense' THEN amount END), 0)
+        FROM rollup_daily WHERE {where}
+        """,
+        params
+    )[0]
+    return {'count': count, 'income': income, 'expense': abs(expense)}
+
+
+def _to_frame(df):
+    """Приведение типов результата к виду DataFrame дашборда"""
+    df['date'] = pd.to_datetime(df['date'])
+    df['description'] = df['description'].fillna('')
+    return df
+
+
+def query_transactions(db, user_id=DEFAULT_USER_ID, start_date=None, end_date=None,
+                       category=None, limit=None):
+    """Транзакции за период, новые сверху"""
+    where, params = _where(user_id, start_date, end_date, category)
+    query = f"""
+        SELECT id, date, type, category, amount, description
+        FROM transactions WHERE {where}
+        ORDER BY date DESC, id DESC
+    """
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(int(limit))
+    return _to_frame(db.get_dataframe(query, params))
+
+
+def top_expenses(db, user_id=DEFAULT_USER_ID, start_date=None, end_date=None,
+                 category=None, limit=5):
+    """Самые крупные траты за период"""
+    where, params = _where(user_id, start_date, end_date, category)
+    query = f"""
+        SELECT id, date, type, category, amount, description
+        FROM transactions WHERE {where} AND type = 'expense'
+        ORDER BY amount ASC
+        LIMIT ?
+    """
+    return _to_frame(db.get_dataframe(query, params + [int(limit)]))
+
+
+def fetch_page(db, user_id=DEFAULT_USER_ID, start_date=None, end_date=None, category=None,
+               cursor=None, page_size=PAGE_SIZE):
+    """Одна страница транзакций с пагинацией по ключу (date, id)
+
+    cursor — (date, id) последней строки предыдущей страницы или None для
+    первой. Возвращает (DataFrame страницы, курсор следующей страницы или None).
+    Запрос не использует OFFSET, поэтому стоимость не растет с номером страницы.
+    """
+    where, params = _where(user_id, start_date, end_date, category)
+    if cursor is not None:
+        where += ' AND (date, id) < (?, ?)'
+        params.extend([str(cursor[0]), int(cursor[1])])
+
+    # Берем на одну строку больше, чтобы узнать, есть ли следующая страница
+    page = db.get_dataframe(
+        f"""
+        SELECT id, date, type, category, amount, description
+        FROM transactions WHERE {where}
+        ORDER BY date DESC, id DESC
+        LIMIT ?
+        """,
+        params + [int(page_size) + 1]
+    )
+
+    next_cursor = None
+    if len(page) > page_size:
+        page = page.iloc[:page_size].copy()
+        last = page.iloc[-1]
+        next_cursor = (last['date'], int(last['id']))
+    return _to_frame(page), next_cursor
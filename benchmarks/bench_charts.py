@@ -0,0 +1,95 @@
+# benchmarks/bench_charts.py
+"""Графики на 1000 перезапусков: matplotlib на каждый перезапуск против кэшированных фигур plotly
+
+Перезапуск имитирует то, что делает Streamlit: построить фигуры (или взять
+из кэша) и сериализовать их для браузера. Замеряется время на перезапуск
+и прирост RSS процесса.
+
+Запуск: python -m benchmarks.bench_charts --reruns 1000 --years 20
+"""
+import argparse
+import gc
+import io
+import os
+import time
+
+import pandas as pd
+import plotly.io as pio
+
+from app import generator
+from app.aggregates import TransactionCube
+from app.charts import build_charts
+
+
+def rss_bytes():
+    """Текущий RSS процесса (psutil, иначе /proc)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def matplotlib_rerun(aggregates):
+    """Старый путь: новые фигуры и PNG на каждый перезапуск, без plt.close"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    expense = aggregates.by_category('expense')
+    fig, ax = plt.subplots(figsize=(8, 6))
+    ax.pie(expense.values, labels=expense.index, autopct='%1.1f%%', startangle=90)
+    fig.savefig(io.BytesIO(), format='png')
+
+    monthly = aggregates.monthly()
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.plot(monthly.index.astype(str), monthly['income'], marker='o')
+    ax.plot(monthly.index.astype(str), abs(monthly['expense']), marker='s')
+    fig.savefig(io.BytesIO(), format='png')
+
+
+def run(name, rerun, reruns):
+    """Время на перезапуск и прирост RSS за reruns перезапусков"""
+    gc.collect()
+    before = rss_bytes()
+    started = time.perf_counter()
+    for _ in range(reruns):
+        rerun()
+    seconds = time.perf_counter() - started
+    gc.collect()
+    growth = rss_bytes() - before
+    print(f"{name:22s} {seconds / reruns * 1000:8.2f} мс/перезапуск   "
+          f"RSS +{growth / 2**20:7.1f} МБ", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reruns', type=int, default=1000)
+    parser.add_argument('--years', type=int, default=20, help="длина истории (для прореживания)")
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--no-matplotlib', action='store_true', help="без замера старого пути")
+    args = parser.parse_args()
+
+    df = pd.concat(generator.iter_chunks(rows=args.rows, days=args.years * 365, seed=42,
+                                         users=max(1, args.rows // (args.years * 365 * 5))))
+    aggregates = TransactionCube.from_frame(df)
+    print(f"{aggregates.rows:,} транзакций, {len(aggregates.monthly())} месяцев, "
+          f"{args.reruns} перезапусков")
+
+    cached = build_charts(aggregates)
+    run('plotly кэш', lambda: [pio.to_json(fig, validate=False) for fig in cached.values()], args.reruns)
+    run('plotly без кэша', lambda: [pio.to_json(fig, validate=False)
+                                    for fig in build_charts(aggregates).values()], args.reruns)
+
+    if not args.no_matplotlib:
+        try:
+            import matplotlib  # noqa: F401
+        except ImportError:
+            print("matplotlib не установлен — старый путь пропущен")
+        else:
+            run('matplotlib', lambda: matplotlib_rerun(aggregates), args.reruns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/bench_db_pool.py
+"""Запросов в секунду при конкурентных читателях: без пула и с пулом
+
+Запуск: python -m benchmarks.bench_db_pool --readers 16 --seconds 5
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from database import Database
+
+# Короткий запрос по первичному ключу: здесь стоимость подключения видна лучше всего
+QUERY = "SELECT id, amount, category, date FROM transactions WHERE id = ?"
+
+
+def seed(db_path, rows):
+    """Тестовая база с rows транзакциями"""
+    db = Database(db_path, pool_size=1)
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO users (email, full_name) VALUES ('bench@example.com', 'Bench')")
+        conn.executemany(
+            "INSERT INTO transactions (user_id, amount, category, date, type) VALUES (?, ?, ?, ?, ?)",
+            ((1 + i % 10, -100.0 - i % 500, 'кафе', f'2024-{1 + i % 12:02d}-{1 + i % 28:02d}', 'expense')
+             for i in range(rows))
+        )
+        conn.commit()
+    db.close()
+
+
+def run(db, readers, seconds, rows):
+    """Сколько запросов успевают выполнить readers потоков за seconds"""
+    stop = time.perf_counter() + seconds
+    counts = [0] * readers
+
+    def reader(slot):
+        while time.perf_counter() < stop:
+            db.execute_query(QUERY, (1 + (counts[slot] * 7919 + slot) % rows,))
+            counts[slot] += 1
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(counts) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--pool-size', type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        seed(db_path, args.rows)
+
+        before = run(Database(db_path, pool_size=0), args.readers, args.seconds, args.rows)
+        pooled = Database(db_path, pool_size=args.pool_size)
+        after = run(pooled, args.readers, args.seconds, args.rows)
+        pooled.close()
+
+    print(f"читателей: {args.readers}, строк: {args.rows:,}")
+    print(f"без пула:          {before:10,.0f} запросов/с")
+    print(f"пул ({args.pool_size:2d} соедин.): {after:10,.0f} запросов/с  (x{after / before:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# benchmarks/bench_formatting.py
+"""Форматирование колонок 'Сумма', 'Тип', 'Дата': apply(lambda) против app.formatting
+
+Запуск: python -m benchmarks.bench_formatting --rows 100000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.formatting import format_dates, format_money, format_type
+
+
+def best_of(func, repeat):
+    """Лучшее время из repeat запусков"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    amounts = pd.Series(np.round(rng.normal(0, 20_000, args.rows), 2))
+    types = pd.Series(np.where(amounts > 0, 'income', 'expense'))
+    # Около пяти операций в день, как в демо-данных
+    dates = pd.Series(pd.Timestamp('2024-01-01') + pd.to_timedelta(np.arange(args.rows) // 5, unit='D'))
+
+    cases = [
+        ("Сумма", lambda: amounts.apply(lambda x: f"{x:+,.2f} ₽"), lambda: format_money(amounts)),
+        ("Тип", lambda: types.apply(lambda x: '📈 Доход' if x == 'income' else '📉 Трата'),
+         lambda: format_type(types)),
+        ("Дата", lambda: dates.dt.strftime('%d.%m.%Y'), lambda: format_dates(dates)),
+    ]
+
+    print(f"строк: {args.rows:,}")
+    for name, old, new in cases:
+        old_time, old_result = best_of(old, args.repeat)
+        new_time, new_result = best_of(new, args.repeat)
+        same = (old_result.astype(object) == new_result.astype(object)).all()
+        print(f"{name:6s} apply: {old_time * 1000:8.1f} мс   вектор: {new_time * 1000:8.1f} мс   "
+              f"x{old_time / new_time:5.1f}   совпадает: {'да' if same else 'НЕТ'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# benchmarks/bench_simulation.py
+"""Время Монте-Карло симуляции: цель — меньше 1 с на 10k путей × 10 целей
+
+Запуск: python -m benchmarks.bench_simulation --paths 10000 --goals 10 --months 36
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from app.simulation import simulate_goals
+
+TARGET_SECONDS = 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--paths', type=int, default=10_000)
+    parser.add_argument('--goals', type=int, default=10)
+    parser.add_argument('--months', type=int, default=36, help="самый дальний срок цели")
+    parser.add_argument('--history', type=int, default=12, help="месяцев истории")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    history = pd.DataFrame({
+        'income': rng.normal(150_000, 30_000, args.history),
+        'expense': rng.normal(110_000, 20_000, args.history),
+    })
+    goals = [
+        {'amount': float(amount), 'saved': 0.0, 'months': int(months)}
+        for amount, months in zip(
+            rng.uniform(50_000, 1_000_000, args.goals),
+            rng.integers(1, args.months + 1, args.goals)
+        )
+    ]
+    goals[0]['months'] = args.months
+
+    result = simulate_goals(history, goals, n_paths=args.paths, seed=1)
+    verdict = 'OK' if result['seconds'] < TARGET_SECONDS else 'медленнее цели'
+    print(f"{args.paths:,} путей × {args.goals} целей × {args.months} мес: "
+          f"{result['seconds']:.3f} с ({verdict})")
+
+
+if __name__ == "__main__":
+    main()
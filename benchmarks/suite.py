@@ -0,0 +1,190 @@
+# benchmarks/suite.py
+"""Набор бенчмарков горячих путей на 10k / 1M / 10M транзакций
+
+Для каждого размера генерирует синтетический набор (app/generator.py),
+замеряет загрузку, агрегаты, фильтр транзакций, помесячную сводку и
+прогноз, и пишет время и пиковую память в JSON для сравнения прогонов.
+
+Запуск:
+    python -m benchmarks.suite --sizes 10k,1m
+    python -m benchmarks.suite --sizes 10k --compare benchmarks/results/prev.json
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+import untitled13
+from app import generator
+from app.aggregates import TransactionCube, financial_summary, goals_progress
+from app.cache import cache_dir_for, load_cached
+from app.forecast import sensitivity_grid
+from app.loader import load_transactions
+from app.simulation import monthly_history, simulate_goals
+from app.transactions import fetch_page, period_totals
+from database import Database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+# Среднее число операций на пользователя в день у генератора
+ROWS_PER_USER_DAY = 5.5
+SPAN_DAYS = 3 * 365
+
+
+def parse_size(text):
+    """'10k' -> 10000, '1m' -> 1000000"""
+    text = text.strip().lower()
+    factor = {'k': 1_000, 'm': 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip('km')) * factor)
+
+
+def make_dataset(rows, users, categories, tmp_dir):
+    """Синтетический набор в JSON-файле и DataFrame для замеров"""
+    # Пользователей столько, чтобы история укладывалась в SPAN_DAYS
+    users = max(users, math.ceil(rows / (ROWS_PER_USER_DAY * SPAN_DAYS)))
+    chunks = generator.iter_chunks(
+        rows=rows, users=users, seed=42,
+        days=SPAN_DAYS,
+        categories_expense=untitled13.extend_categories(untitled13.CATEGORIES_EXPENSE, categories),
+    )
+    df = generator._text_frame(pd.concat(chunks, ignore_index=True))
+
+    path = os.path.join(tmp_dir, f'transactions_{rows}.json')
+    df.to_json(path, orient='records', force_ascii=False)
+    return path, users
+
+
+def measure(func, setup=None, trace_memory=True):
+    """Время вызова и (отдельным прогоном) пик памяти по tracemalloc"""
+    if setup:
+        setup()
+    gc.collect()
+    started = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - started
+
+    peak = None
+    if trace_memory:
+        if setup:
+            setup()
+        gc.collect()
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def run_size(rows, args, tmp_dir):
+    """Все замеры для одного размера набора"""
+    results = []
+
+    def record(case, func, setup=None):
+        result, seconds, peak = measure(func, setup, not args.no_memory)
+        results.append({'size': rows, 'case': case, 'seconds': seconds, 'peak_bytes': peak})
+        peak_text = f"{peak / 2**20:9.1f} МБ" if peak is not None else ''
+        print(f"  {case:24s} {seconds:9.3f} с {peak_text}", flush=True)
+        return result
+
+    started = time.perf_counter()
+    path, users = make_dataset(rows, args.users, args.categories, tmp_dir)
+    print(f"{rows:,} строк, {users} польз., {os.path.getsize(path) / 2**20:.1f} МБ JSON "
+          f"(генерация {time.perf_counter() - started:.1f} с)", flush=True)
+
+    clear_cache = lambda: shutil.rmtree(cache_dir_for(path), ignore_errors=True)
+    df, _ = record('load_transactions', lambda: load_transactions(path))
+    record('load_cached_cold', lambda: load_cached(path), setup=clear_cache)
+    record('load_cached_warm', lambda: load_cached(path))
+
+    cube = record('aggregates_build', lambda: TransactionCube.from_frame(df))
+    record('get_financial_summary', lambda: financial_summary(cube))
+    record('get_goals_progress', lambda: goals_progress(cube))
+    record('monthly_pivot', lambda: cube.monthly())
+
+    goals = np.linspace(100_000, 5_000_000, 100)
+    record('forecast_grid', lambda: sensitivity_grid(
+        np.zeros_like(goals), goals, [5000, 10000, 20000, 50000], [0, 3, 5, 7, 10, 15]
+    ))
+    history = monthly_history(cube)
+    record('monte_carlo_10k', lambda: simulate_goals(
+        history, [{'amount': g, 'saved': 0, 'months': 36} for g in goals[:10]],
+        n_paths=10_000, seed=1
+    ))
+
+    if not args.no_db:
+        db_path = os.path.join(tmp_dir, f'bench_{rows}.db')
+        db = Database(db_path)
+        record('db_bulk_insert', lambda: db.bulk_insert_transactions(df, dedupe=False),
+               setup=lambda: db.execute_query("DELETE FROM transactions"))
+        last = df['date'].max()
+        window = dict(start_date=(last - pd.Timedelta(days=30)).date(), end_date=last.date(), category=None)
+        record('transactions_filter', lambda: (period_totals(db, **window), fetch_page(db, **window)))
+        db.close()
+
+    return results
+
+
+def compare(current, previous_path):
+    """Сравнение с прошлым прогоном: отношение времени по каждому замеру"""
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = json.load(f)
+    before = {(r['size'], r['case']): r for r in previous['results']}
+
+    print(f"\nСравнение с {previous_path}:")
+    for r in current:
+        old = before.get((r['size'], r['case']))
+        if old and old['seconds'] > 0:
+            ratio = r['seconds'] / old['seconds']
+            mark = '⚠️' if ratio > 1.2 else '  '
+            print(f"{mark} {r['size']:>10,} {r['case']:24s} x{ratio:5.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10k,1m,10m')
+    parser.add_argument('--users', type=int, default=1, help="минимум пользователей")
+    parser.add_argument('--categories', type=int, default=len(untitled13.CATEGORIES_EXPENSE),
+                        help="категорий расходов")
+    parser.add_argument('--out', default=None, help="файл результатов (JSON)")
+    parser.add_argument('--compare', default=None, help="прошлый файл результатов")
+    parser.add_argument('--no-db', action='store_true', help="без замеров SQLite")
+    parser.add_argument('--no-memory', action='store_true', help="без замера пиковой памяти")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes.split(','):
+            results.extend(run_size(parse_size(size), args, tmp_dir))
+
+    out = args.out or os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump({
+            'meta': {
+                'date': date.today().isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'numpy': np.__version__,
+                'pandas': pd.__version__,
+                'args': vars(args),
+            },
+            'results': results,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\nРезультаты: {out}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,471 @@
 # database.py
+import itertools
+import os
+import queue
 import sqlite3
+import threading
+import time
 import pandas as pd
 from contextlib import contextmanager
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Демо-наборы, которые загружает import_json_datasets()
+BUNDLED_DATASETS = [
+    os.path.join(BASE_DIR, 'data', 'csvjson.json'),
+    os.path.join(BASE_DIR, 'data', 'mock_transactions.json'),
+    os.path.join(BASE_DIR, 'data', 'mock_data.json'),
+]
+
+TRANSACTION_COLUMNS = ('user_id', 'account_id', 'amount', 'category', 'description', 'date', 'type', 'is_manual',
+                       'source')
+
+_INSERT_TRANSACTION = f"""
+    INSERT INTO transactions ({', '.join(TRANSACTION_COLUMNS)})
+    VALUES ({', '.join('?' * len(TRANSACTION_COLUMNS))})
+"""
+
+# Естественный ключ операции: пользователь, дата, сумма, категория, тип, описание
+_INSERT_TRANSACTION_DEDUPE = f"""
+    INSERT INTO transactions ({', '.join(TRANSACTION_COLUMNS)})
+    SELECT {', '.join('?' * len(TRANSACTION_COLUMNS))}
+    WHERE NOT EXISTS (
+        SELECT 1 FROM transactions
+        WHERE user_id = ? AND date = ? AND amount = ? AND category = ?
+          AND type = ? AND COALESCE(description, '') = ?
+    )
+"""
+
+# Настройки SQLite по умолчанию, любую можно переопределить через pragmas=
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',      # читатели не блокируют писателя
+    'synchronous': 'NORMAL',    # в режиме WAL безопасно и заметно быстрее FULL
+    'cache_size': -16000,       # ~16 МБ страничного кэша на соединение
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Материализованные свертки: суммы и количества по пользователю, дню/месяцу,
+# категории и типу. Поддерживаются триггерами в той же транзакции, что и
+# изменение transactions; type NULL хранится как ''.
+ROLLUP_TABLES = {
+    'rollup_daily': ('day', "date({row}.date)"),
+    'rollup_monthly': ('month', "strftime('%Y-%m', {row}.date)"),
+}
+
+
+def _rollup_add(table, row, sign):
+    """SQL триггера: прибавить (sign=1) или вычесть (sign=-1) строку row (NEW/OLD)"""
+    period, expr = ROLLUP_TABLES[table]
+    key = f"{expr.format(row=row)}, {row}.category, COALESCE({row}.type, '')"
+    if sign > 0:
+        return f'''
+            INSERT INTO {table} (user_id, {period}, category, type, amount, count)
+            VALUES ({row}.user_id, {key}, {row}.amount, 1)
+            ON CONFLICT (user_id, {period}, category, type)
+            DO UPDATE SET amount = amount + excluded.amount, count = count + 1;'''
+    condition = f"user_id = {row}.user_id AND ({period}, category, type) = ({key})"
+    return f'''
+            UPDATE {table} SET amount = amount - {row}.amount, count = count - 1 WHERE {condition};
+            DELETE FROM {table} WHERE {condition} AND count <= 0;'''
+
+
+def _revision_bump(row):
+    """SQL триггера: +1 к счетчику правок пользователя строки row (NEW/OLD)"""
+    return f'''
+            INSERT INTO transaction_revisions (user_id, revision) VALUES ({row}.user_id, 1)
+            ON CONFLICT (user_id) DO UPDATE SET revision = revision + 1;'''
+
+
+def _rollup_fill(table):
+    """Заполнение свертки с нуля одним GROUP BY по transactions"""
+    period, expr = ROLLUP_TABLES[table]
+    return f'''INSERT INTO {table} (user_id, {period}, category, type, amount, count)
+               SELECT user_id, {expr.format(row='transactions')}, category, COALESCE(type, ''),
+                      SUM(amount), COUNT(*)
+               FROM transactions GROUP BY 1, 2, 3, 4'''
+
+
+# Версионированные миграции схемы: (версия, описание, список SQL).
+# Номер последней примененной хранится в PRAGMA user_version.
+MIGRATIONS = [
+    (1, 'индексы для горячих запросов', [
+        # Даты по пользователю; покрывает суммы за период и ключ дедупликации
+        '''CREATE INDEX IF NOT EXISTS idx_transactions_user_date
+           ON transactions (user_id, date, amount, category, type)''',
+        # Свертки по категориям и типам для пользователя
+        '''CREATE INDEX IF NOT EXISTS idx_transactions_user_category
+           ON transactions (user_id, category, type, date, amount)''',
+        '''CREATE INDEX IF NOT EXISTS idx_goals_user
+           ON goals (user_id, deadline)''',
+        '''CREATE INDEX IF NOT EXISTS idx_accounts_user
+           ON accounts (user_id)''',
+    ]),
+    (2, 'индекс для пагинации по ключу (date, id)', [
+        '''CREATE INDEX IF NOT EXISTS idx_transactions_user_date_id
+           ON transactions (user_id, date, id)''',
+    ]),
+    (3, 'свертки по дням и месяцам с триггерами', [
+        *(f'''CREATE TABLE IF NOT EXISTS {table} (
+                user_id INTEGER NOT NULL,
+                {period} TEXT NOT NULL,
+                category TEXT NOT NULL,
+                type TEXT NOT NULL,
+                amount REAL NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (user_id, {period}, category, type)
+            ) WITHOUT ROWID''' for table, (period, _) in ROLLUP_TABLES.items()),
+        f'''CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_insert
+            AFTER INSERT ON transactions BEGIN
+            {_rollup_add('rollup_daily', 'NEW', 1)}
+            {_rollup_add('rollup_monthly', 'NEW', 1)}
+            END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_delete
+            AFTER DELETE ON transactions BEGIN
+            {_rollup_add('rollup_daily', 'OLD', -1)}
+            {_rollup_add('rollup_monthly', 'OLD', -1)}
+            END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_update
+            AFTER UPDATE OF user_id, amount, category, date, type ON transactions BEGIN
+            {_rollup_add('rollup_daily', 'OLD', -1)}
+            {_rollup_add('rollup_monthly', 'OLD', -1)}
+            {_rollup_add('rollup_daily', 'NEW', 1)}
+            {_rollup_add('rollup_monthly', 'NEW', 1)}
+            END''',
+        *(_rollup_fill(table) for table in ROLLUP_TABLES),
+    ]),
+    (4, 'категория, срок, срочность и версия целей', [
+        "ALTER TABLE goals ADD COLUMN category TEXT DEFAULT 'Другое'",
+        "ALTER TABLE goals ADD COLUMN months INTEGER",
+        "ALTER TABLE goals ADD COLUMN urgency TEXT",
+        # Оптимистичная блокировка: UPDATE ... WHERE version = ожидаемая
+        "ALTER TABLE goals ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+    ]),
+    (5, 'правила автокатегоризации', [
+        '''CREATE TABLE IF NOT EXISTS category_rules (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                pattern TEXT NOT NULL,
+                kind TEXT NOT NULL DEFAULT 'substring' CHECK(kind IN ('substring', 'regex')),
+                category TEXT NOT NULL,
+                type TEXT CHECK(type IN ('expense', 'income', 'transfer')),
+                priority INTEGER NOT NULL DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users(id)
+            )''',
+        '''CREATE INDEX IF NOT EXISTS idx_category_rules_user
+           ON category_rules (user_id, priority)''',
+        # Каким правилом назначена категория (NULL — из файла, вручную или не найдено)
+        "ALTER TABLE transactions ADD COLUMN rule_id INTEGER",
+        # Переклассификация обновляет строки по описанию
+        '''CREATE INDEX IF NOT EXISTS idx_transactions_user_description
+           ON transactions (user_id, description)''',
+    ]),
+    # Вставки видны по MAX(id) и числу строк, правки и удаления — только по счетчику;
+    # на INSERT триггера нет, массовая загрузка не замедляется
+    (6, 'счетчик правок и удалений транзакций', [
+        '''CREATE TABLE IF NOT EXISTS transaction_revisions (
+                user_id INTEGER PRIMARY KEY,
+                revision INTEGER NOT NULL
+            )''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_transactions_revision_update
+            AFTER UPDATE ON transactions BEGIN
+            {_revision_bump('OLD')}
+            {_revision_bump('NEW')}
+            END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_transactions_revision_delete
+            AFTER DELETE ON transactions BEGIN
+            {_revision_bump('OLD')}
+            END''',
+    ]),
+    (7, 'файл-источник строк и версии загруженных файлов', [
+        # Путь файла, из которого загружена строка (NULL — вручную, выписка, генератор)
+        "ALTER TABLE transactions ADD COLUMN source TEXT",
+        '''CREATE TABLE IF NOT EXISTS dataset_imports (
+                user_id INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                version TEXT NOT NULL,
+                imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (user_id, path)
+            )''',
+    ]),
+]
+
+# Горячие запросы приложения для diagnose_queries(): имя -> (SQL, параметры)
+HOT_QUERIES = {
+    'transactions_by_user': (
+        "SELECT * FROM transactions WHERE user_id = ? ORDER BY date DESC",
+        (1,)
+    ),
+    'transactions_by_period': (
+        "SELECT * FROM transactions WHERE user_id = ? AND date BETWEEN ? AND ? ORDER BY date DESC",
+        (1, '2024-01-01', '2024-12-31')
+    ),
+    'transactions_page': (
+        "SELECT id, date, type, category, amount, description FROM transactions "
+        "WHERE user_id = ? AND date >= ? AND date <= ? AND (date, id) < (?, ?) "
+        "ORDER BY date DESC, id DESC LIMIT ?",
+        (1, '2024-01-01', '2024-12-31', '2024-06-01', 1000, 51)
+    ),
+    'totals_by_period': (
+        "SELECT type, SUM(amount), COUNT(*) FROM transactions "
+        "WHERE user_id = ? AND date BETWEEN ? AND ? GROUP BY type",
+        (1, '2024-01-01', '2024-12-31')
+    ),
+    'category_rollup': (
+        "SELECT category, type, SUM(amount), COUNT(*) FROM transactions "
+        "WHERE user_id = ? GROUP BY category, type",
+        (1,)
+    ),
+    'rollup_by_category': (
+        "SELECT category, type, SUM(amount), SUM(count) FROM rollup_monthly "
+        "WHERE user_id = ? GROUP BY category, type",
+        (1,)
+    ),
+    'rollup_by_period': (
+        "SELECT type, SUM(amount), SUM(count) FROM rollup_daily "
+        "WHERE user_id = ? AND day BETWEEN ? AND ? GROUP BY type",
+        (1, '2024-01-01', '2024-12-31')
+    ),
+    'goals_by_user': (
+        "SELECT * FROM goals WHERE user_id = ? ORDER BY deadline",
+        (1,)
+    ),
+    'accounts_by_user': (
+        "SELECT * FROM accounts WHERE user_id = ?",
+        (1,)
+    ),
+}
+
+class PooledConnection(sqlite3.Connection):
+    """Соединение пула: помнит время последней проверки"""
+    last_checked = 0.0
+
 class Database:
-    def __init__(self, db_path='financial_assistant.db'):
+    def __init__(self, db_path='financial_assistant.db', pool_size=8, pragmas=None,
+                 timeout=30.0, health_check_interval=60.0):
+        """pool_size=0 отключает пул: соединение открывается на каждый запрос"""
         self.db_path = db_path
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.pragmas = dict(DEFAULT_PRAGMAS, **(pragmas or {}))
+        
+        # База в памяти живет только в своем соединении — держим ровно одно
+        if db_path == ':memory:':
+            pool_size = 1
+            self.pragmas.pop('journal_mode', None)
+        self.pool_size = pool_size
+        
+        self._pool = queue.LifoQueue(maxsize=max(pool_size, 1))
+        self._pool_lock = threading.Lock()
+        self._created = 0
+        self._local = threading.local()
+        
         self.init_db()
     
+    def _connect(self):
+        """Новое соединение с примененными PRAGMA"""
+        conn = sqlite3.connect(
+            self.db_path, timeout=self.timeout,
+            check_same_thread=False, factory=PooledConnection
+        )
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        conn.last_checked = time.monotonic()
+        return conn
+    
+    def _is_healthy(self, conn):
+        """Проверка соединения, если оно давно простаивало"""
+        if time.monotonic() - conn.last_checked < self.health_check_interval:
+            return True
+        try:
+            conn.execute("SELECT 1").fetchone()
+        except sqlite3.Error:
+            return False
+        conn.last_checked = time.monotonic()
+        return True
+    
+    def _acquire(self):
+        """Взять соединение из пула или создать новое в пределах pool_size"""
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                with self._pool_lock:
+                    can_create = self._created < self.pool_size
+                    if can_create:
+                        self._created += 1
+                if can_create:
+                    try:
+                        return self._connect()
+                    except Exception:
+                        with self._pool_lock:
+                            self._created -= 1
+                        raise
+                conn = self._pool.get(timeout=self.timeout)
+            
+            if self._is_healthy(conn):
+                return conn
+            self._discard(conn)
+    
+    def _release(self, conn):
+        """Вернуть соединение в пул, откатив незавершенную транзакцию"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        conn.last_checked = time.monotonic()
+        self._pool.put(conn)
+    
+    def _discard(self, conn):
+        """Закрыть сломанное соединение и освободить место в пуле"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._pool_lock:
+            self._created -= 1
+    
+    def close(self):
+        """Закрыть все свободные соединения пула"""
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+    
     def init_db(self):
-        """Создаем таблицы при первом запуске"""
-        conn = sqlite3.connect(self.db_path)
+        """Создаем таблицы при первом запуске и применяем миграции"""
+        with self.get_connection() as conn:
+            self._create_tables(conn)
+            self.migrate(conn)
+    
+    def schema_version(self):
+        """Текущая версия схемы (PRAGMA user_version)"""
+        with self.get_connection() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    def migrate(self, conn=None):
+        """Применить миграции из MIGRATIONS, которых еще нет в базе
+
+        Каждая миграция выполняется в своей транзакции вместе с записью
+        новой версии, поэтому прерванная миграция повторится целиком.
+        """
+        if conn is None:
+            with self.get_connection() as conn:
+                return self.migrate(conn)
+        
+        applied = []
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        for version, description, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            try:
+                conn.execute("BEGIN")
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied.append((version, description))
+        return applied
+    
+    def rebuild_rollups(self):
+        """Пересчитать свертки с нуля из transactions в одной транзакции"""
+        started = time.perf_counter()
+        counts = {}
+        with self.get_connection() as conn:
+            try:
+                conn.execute("BEGIN")
+                for table in ROLLUP_TABLES:
+                    conn.execute(f"DELETE FROM {table}")
+                    conn.execute(_rollup_fill(table))
+                    counts[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return {**counts, 'seconds': time.perf_counter() - started}
+    
+    def check_rollups(self, tolerance=0.01, limit=20):
+        """Сверка сверток с GROUP BY по transactions
+
+        Возвращает для каждой свертки число расходящихся групп и первые
+        limit из них: (user_id, период, категория, тип, в свертке, в транзакциях).
+        """
+        report = {'ok': True}
+        with self.get_connection() as conn:
+            for table, (period, expr) in ROLLUP_TABLES.items():
+                actual = f'''
+                    SELECT user_id, {expr.format(row='transactions')} AS {period}, category,
+                           COALESCE(type, '') AS type, SUM(amount) AS amount, COUNT(*) AS count
+                    FROM transactions GROUP BY 1, 2, 3, 4
+                '''
+                # Полное внешнее соединение через UNION двух LEFT JOIN
+                query = f'''
+                    WITH actual AS ({actual})
+                    SELECT r.user_id, r.{period}, r.category, r.type,
+                           r.amount, r.count, a.amount, a.count
+                    FROM {table} r LEFT JOIN actual a
+                      ON a.user_id = r.user_id AND a.{period} = r.{period}
+                     AND a.category = r.category AND a.type = r.type
+                    WHERE a.count IS NULL OR a.count != r.count OR ABS(a.amount - r.amount) > ?
+                    UNION ALL
+                    SELECT a.user_id, a.{period}, a.category, a.type,
+                           NULL, NULL, a.amount, a.count
+                    FROM actual a LEFT JOIN {table} r
+                      ON a.user_id = r.user_id AND a.{period} = r.{period}
+                     AND a.category = r.category AND a.type = r.type
+                    WHERE r.count IS NULL
+                '''
+                rows = conn.execute(query, (tolerance,)).fetchall()
+                report[table] = {'mismatches': len(rows), 'examples': rows[:limit]}
+                report['ok'] = report['ok'] and not rows
+        return report
+    
+    def get_rollup(self, user_id, level='daily', start=None, end=None):
+        """Строки свертки пользователя (level: daily/monthly) за период включительно"""
+        table = f'rollup_{level}'
+        period = ROLLUP_TABLES[table][0]
+        query = f"SELECT {period}, category, type, amount, count FROM {table} WHERE user_id = ?"
+        params = [user_id]
+        if start is not None:
+            query += f" AND {period} >= ?"
+            params.append(str(start))
+        if end is not None:
+            query += f" AND {period} <= ?"
+            params.append(str(end))
+        return self.get_dataframe(query, params)
+    
+    def explain_query_plan(self, query, params=()):
+        """EXPLAIN QUERY PLAN для запроса: список строк detail"""
+        with self.get_connection() as conn:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+        return [row[-1] for row in rows]
+    
+    def diagnose_queries(self, queries=None):
+        """Планы горячих запросов приложения с пометкой полных сканов и сортировок
+
+        Временное B-дерево для GROUP BY по нескольким группам не считается
+        проблемой, а для ORDER BY означает сортировку всей выборки.
+        """
+        report = []
+        for name, (query, params) in (queries or HOT_QUERIES).items():
+            plan = self.explain_query_plan(query, params)
+            problems = [
+                detail for detail in plan
+                if detail.startswith('SCAN') or 'TEMP B-TREE FOR ORDER BY' in detail
+            ]
+            report.append({'name': name, 'plan': plan, 'problems': problems, 'ok': not problems})
+        return report
+    
+    def _create_tables(self, conn):
+        """DDL схемы"""
         cursor = conn.cursor()
         
         # Пользователи
@@ -70,16 +525,38 @@ class Database:
         ''')
         
         conn.commit()
-        conn.close()
     
     @contextmanager
     def get_connection(self):
-        """Контекстный менеджер для подключения"""
-        conn = sqlite3.connect(self.db_path)
+        """Контекстный менеджер для подключения
+
+        Соединение закреплено за потоком на время использования: вложенные
+        вызовы в том же потоке получают то же соединение.
+        """
+        if self.pool_size <= 0:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout)
+            try:
+                yield conn
+            finally:
+                conn.close()
+            return
+        
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            self._local.depth += 1
+            try:
+                yield held
+            finally:
+                self._local.depth -= 1
+            return
+        
+        conn = self._acquire()
+        self._local.conn, self._local.depth = conn, 1
         try:
             yield conn
         finally:
-            conn.close()
+            self._local.conn, self._local.depth = None, 0
+            self._release(conn)
     
     def execute_query(self, query, params=()):
         """Выполнить запрос и вернуть результат"""
@@ -94,17 +571,166 @@ class Database:
         with self.get_connection() as conn:
             return pd.read_sql_query(query, conn, params=params)
 
-# Использование
-db = Database()
+    @staticmethod
+    def _transaction_rows(rows, user_id, account_id=None, is_manual=False, source=None):
+        """Приведение DataFrame, блоков DataFrame или словарей к кортежам вставки"""
+        if isinstance(rows, pd.DataFrame):
+            rows = [rows]
+        
+        for item in rows:
+            if isinstance(item, pd.DataFrame):
+                if item.empty:
+                    continue
+                # Колонки целиком, без построчного разбора
+                dates = pd.to_datetime(item['date']).dt.strftime('%Y-%m-%d')
+                if 'description' in item.columns:
+                    descriptions = item['description'].astype(object).where(item['description'].notna(), '')
+                else:
+                    descriptions = itertools.repeat('')
+                yield from zip(
+                    item['user_id'] if 'user_id' in item.columns else itertools.repeat(user_id),
+                    itertools.repeat(account_id),
+                    item['amount'].astype(float),
+                    item['category'].astype(object),
+                    descriptions,
+                    dates,
+                    item['type'].astype(object),
+                    itertools.repeat(int(is_manual)),
+                    itertools.repeat(source),
+                )
+            else:
+                date = item['date']
+                yield (
+                    item.get('user_id', user_id),
+                    item.get('account_id', account_id),
+                    float(item['amount']),
+                    item['category'],
+                    item.get('description') or '',
+                    date if isinstance(date, str) else pd.Timestamp(date).strftime('%Y-%m-%d'),
+                    item['type'],
+                    int(item.get('is_manual', is_manual)),
+                    item.get('source', source),
+                )
+    
+    def bulk_insert_transactions(self, rows, user_id=1, account_id=None, batch_size=5000,
+                                 dedupe=False, is_manual=False, source=None):
+        """Массовая вставка транзакций пакетами через executemany
 
-# Пример: добавить пользователя
-db.execute_query(
-    "INSERT INTO users (email, full_name) VALUES (?, ?)",
-    ("test@email.com", "Иван Иванов")
-)
+        rows — DataFrame, итератор блоков DataFrame или итератор словарей.
+        По умолчанию вставляются все строки: две одинаковые покупки за день —
+        обычное дело. dedupe=True (только по явному запросу, например для
+        повторной загрузки того же файла) пропускает строки, уже имеющиеся
+        по естественному ключу. source — файл, из которого загружены строки.
+        Возвращает статистику загрузки со скоростью (строк/с).
+        """
+        started = time.perf_counter()
+        stats = {'rows': 0, 'inserted': 0, 'duplicates': 0, 'batches': 0}
+        records = self._transaction_rows(rows, user_id, account_id, is_manual, source)
+        
+        with self.get_connection() as conn:
+            while True:
+                batch = list(itertools.islice(records, batch_size))
+                if not batch:
+                    break
+                
+                try:
+                    # rowcount executemany не включает строки, измененные триггерами сверток
+                    if dedupe:
+                        cursor = conn.executemany(
+                            _INSERT_TRANSACTION_DEDUPE,
+                            (row + (row[0], row[5], row[2], row[3], row[6], row[4]) for row in batch)
+                        )
+                    else:
+                        cursor = conn.executemany(_INSERT_TRANSACTION, batch)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                
+                stats['rows'] += len(batch)
+                stats['inserted'] += cursor.rowcount
+                stats['batches'] += 1
+        
+        stats['duplicates'] = stats['rows'] - stats['inserted']
+        stats['seconds'] = time.perf_counter() - started
+        stats['rows_per_sec'] = stats['rows'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+        return stats
+    
+    def import_json_datasets(self, paths=None, user_id=1, batch_size=5000, dedupe=False):
+        """Загрузка встроенных JSON-наборов в таблицу transactions одним вызовом
 
-# Пример: получить транзакции пользователя
-transactions = db.get_dataframe(
-    "SELECT * FROM transactions WHERE user_id = ? ORDER BY date DESC",
-    (1,)
-)
\ No newline at end of file
+        Файл с тем же содержимым, что уже загруженный в этом вызове, пропускается
+        (csvjson.json и mock_transactions.json — копии одного набора).
+        """
+        from app.cache import file_hash
+        from app.loader import iter_transaction_chunks
+        
+        totals = {'rows': 0, 'inserted': 0, 'duplicates': 0, 'batches': 0, 'seconds': 0.0,
+                  'files': {}, 'skipped': []}
+        seen = set()
+        for path in paths or BUNDLED_DATASETS:
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                continue
+            digest = file_hash(path)
+            if digest in seen:
+                totals['skipped'].append(path)
+                continue
+            seen.add(digest)
+            stats = self.bulk_insert_transactions(
+                iter_transaction_chunks(path, chunk_rows=batch_size),
+                user_id=user_id, batch_size=batch_size, dedupe=dedupe, source=os.path.abspath(path)
+            )
+            totals['files'][path] = stats
+            for key in ('rows', 'inserted', 'duplicates', 'batches', 'seconds'):
+                totals[key] += stats[key]
+        
+        totals['rows_per_sec'] = totals['rows'] / totals['seconds'] if totals['seconds'] > 0 else 0.0
+        return totals
+
+if __name__ == "__main__":
+    import sys
+    
+    # Использование
+    db = Database()
+    
+    # python database.py explain — планы горячих запросов
+    if sys.argv[1:] == ['explain']:
+        print(f"Версия схемы: {db.schema_version()}")
+        for item in db.diagnose_queries():
+            mark = '✅' if item['ok'] else '⚠️'
+            print(f"{mark} {item['name']}")
+            for detail in item['plan']:
+                print(f"     {detail}")
+        sys.exit(0)
+    
+    # python database.py rollups rebuild|check — свертки по дням и месяцам
+    if sys.argv[1:2] == ['rollups']:
+        if sys.argv[2:] == ['rebuild']:
+            stats = db.rebuild_rollups()
+            print(f"Пересчитано: {stats['rollup_daily']:,} дневных и "
+                  f"{stats['rollup_monthly']:,} месячных строк за {stats['seconds']:.2f} с")
+        report = db.check_rollups()
+        for table in ROLLUP_TABLES:
+            mark = '✅' if not report[table]['mismatches'] else '⚠️'
+            print(f"{mark} {table}: расхождений {report[table]['mismatches']}")
+            for example in report[table]['examples']:
+                print(f"     {example}")
+        sys.exit(0 if report['ok'] else 1)
+    
+    # Пример: добавить пользователя
+    db.execute_query(
+        "INSERT OR IGNORE INTO users (email, full_name) VALUES (?, ?)",
+        ("test@email.com", "Иван Иванов")
+    )
+    
+    # Пример: получить транзакции пользователя
+    transactions = db.get_dataframe(
+        "SELECT * FROM transactions WHERE user_id = ? ORDER BY date DESC",
+        (1,)
+    )
+    print(transactions)
+    
+    # Пример: загрузить демо-наборы транзакций; повторный запуск не дублирует строки
+    stats = db.import_json_datasets(dedupe=True)
+    print(f"Загружено {stats['inserted']:,} из {stats['rows']:,} строк "
+          f"({stats['duplicates']:,} дубликатов), {stats['rows_per_sec']:,.0f} строк/с")
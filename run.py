@@ -1,4 +1,5 @@
 import subprocess
+import sys
 import threading
 import time
 from pyngrok import ngrok, conf
@@ -12,9 +13,9 @@ def run_streamlit():
     """Запуск Streamlit приложения"""
     print("🚀 Запускаем Streamlit приложение...")
     
-    # Запускаем Streamlit
+    # Запускаем Streamlit через python -m: корень проекта попадает в путь Python
     subprocess.run([
-        "streamlit", "run", 
+        sys.executable, "-m", "streamlit", "run",
         "app/main.py",
         "--server.port", "8501",
         "--server.headless", "true",
@@ -1,4 +1,5 @@
 import subprocess
+import sys
 import threading
 import time
 from pyngrok import ngrok
@@ -8,7 +9,7 @@ def run_streamlit():
     """Запуск Streamlit"""
     print("🚀 Запускаем Streamlit...")
     subprocess.run([
-        "streamlit", "run", "app/main.py",
+        sys.executable, "-m", "streamlit", "run", "app/main.py",
         "--server.port", "8501",
         "--server.headless", "true",
         "--server.enableCORS", "false",
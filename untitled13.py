@@ -30,36 +30,73 @@ CATEGORIES_INCOME = [
     ("кэшбэк", (50, 500)),
 ]
 
+def extend_categories(categories, count):
+    """Список из count категорий: исходные плюс пронумерованные копии"""
+    result = list(categories[:count])
+    i = 0
+    while len(result) < count:
+        name, rng = categories[i % len(categories)]
+        result.append((f"{name}_{len(result)}", rng))
+        i += 1
+    return result
+
 # --- Генерация данных ---
-rows = []
-start_date = datetime.today() - timedelta(days=365)
+def generate_rows(days=365, users=1, rows=None, categories_expense=CATEGORIES_EXPENSE,
+                  categories_income=CATEGORIES_INCOME, seed=None, start_date=None):
+    """Синтетические транзакции [amount, category, date, type] (+ user_id при users > 1)
+
+    rows — если задано, дни добавляются, пока не наберется столько строк
+    (days тогда задает только дату начала).
+    """
+    rnd = random.Random(seed)
+    start_date = start_date or datetime.today() - timedelta(days=days)
+    result = []
+
+    day_offset = 0
+    while (rows is None and day_offset < days) or (rows is not None and len(result) < rows):
+        date = start_date + timedelta(days=day_offset)
+        date_str = date.strftime("%Y-%m-%d")
+
+        for user_id in range(1, users + 1):
+            num_transactions = rnd.randint(4, 7)
+
+            for _ in range(num_transactions):
+                if rnd.random() < 0.85:  # 85% расходов
+                    category, rng = rnd.choice(categories_expense)
+                    amount = -round(rnd.uniform(*rng), 2)
+                    tx_type = "expense"
+                else:  # 15% доходов
+                    category, rng = rnd.choice(categories_income)
+                    amount = round(rnd.uniform(*rng), 2)
+                    tx_type = "income"
 
-for day_offset in range(365):
-    date = start_date + timedelta(days=day_offset)
-    date_str = date.strftime("%Y-%m-%d")
+                row = [amount, category, date_str, tx_type]
+                if users > 1:
+                    row.append(user_id)
+                result.append(row)
+        day_offset += 1
 
-    num_transactions = random.randint(4, 7)
+    return result[:rows] if rows is not None else result
 
-    for _ in range(num_transactions):
-        if random.random() < 0.85:  # 85% расходов
-            category, rng = random.choice(CATEGORIES_EXPENSE)
-            amount = -round(random.uniform(*rng), 2)
-            tx_type = "expense"
-        else:  # 15% доходов
-            category, rng = random.choice(CATEGORIES_INCOME)
-            amount = round(random.uniform(*rng), 2)
-            tx_type = "income"
+def generate_dataframe(**kwargs):
+    """То же, что generate_rows, но сразу DataFrame"""
+    columns = ["amount", "category", "date", "type"]
+    if kwargs.get('users', 1) > 1:
+        columns.append("user_id")
+    return pd.DataFrame(generate_rows(**kwargs), columns=columns)
 
-        rows.append([amount, category, date_str, tx_type])
+if __name__ == "__main__":
+    import sys
 
-# --- Превращаем в DataFrame ---
-df = pd.DataFrame(rows, columns=["amount", "category", "date", "type"])
+    # --- Превращаем в DataFrame ---
+    df = generate_dataframe(days=365)
 
-# --- Сохраняем в CSV ---
-file_path = "/content/mock_transactions.csv"
-df.to_csv(file_path, index=False, encoding="utf-8")
+    # --- Сохраняем в CSV ---
+    # Большие объемы: python -m app.generator --rows 100m --format csv
+    file_path = sys.argv[1] if len(sys.argv) > 1 else "mock_transactions.csv"
+    df.to_csv(file_path, index=False, encoding="utf-8")
 
-print("CSV сохранён по пути:", file_path)
-df.head()
+    print("CSV сохранён по пути:", file_path)
+    df.head()
 
-df=pd.read_csv('mock_transactions.csv')
\ No newline at end of file
+    df=pd.read_csv(file_path)